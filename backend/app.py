@@ -1,10 +1,17 @@
+import json
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import tempfile
+import time
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from backend import ATSBackend, BulkATSBackend
+from job_store import COMPLETED, FAILED, JobQueue, create_job_store
+from metrics import metrics
+from zip_ingest import ZipLimitError
 
 load_dotenv()
 
@@ -22,9 +29,105 @@ logging.basicConfig(
 
 app = Flask(__name__)
 CORS(app)
+# Larger request bodies are rejected with 413 before they are buffered
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+# Most job descriptions one multi-JD bulk request may score the resume pool against
+MULTI_JD_MAX_ROLES = int(os.getenv("MULTI_JD_MAX_ROLES", "20"))
 
+# Shared across request threads; handlers work on request-scoped sessions from new_session()
 ats_backend = ATSBackend()
 bulk_backend = BulkATSBackend(ats_backend)
+job_queue = JobQueue(create_job_store(), max_workers=int(os.getenv("JOB_WORKERS", "2")))
+
+
+def run_bulk_job(job, zip_path, job_description):
+    """Background task: extracts the spooled ZIP, deletes it and records each resume's result as it finishes."""
+    session = bulk_backend.new_session()  # One backend per job so uploads never mix
+    try:
+        session.extract_text_from_zip(zip_path)
+    finally:
+        os.remove(zip_path)
+    job.set_total(len(session.resumes_data))
+    for index, row in session.iter_bulk_results(job_description):
+        job.add_result(index, row)
+
+
+def run_multi_jd_job(job, zip_path, job_descriptions, roles):
+    """Background task: like run_bulk_job, but records each resume's candidate x role matrix row."""
+    session = bulk_backend.new_session()
+    try:
+        session.extract_text_from_zip(zip_path)
+    finally:
+        os.remove(zip_path)
+    job.set_total(len(session.resumes_data))
+    for index, row in session.iter_multi_jd_results(job_descriptions, roles):
+        job.add_result(index, row)
+
+
+def submit_spooled(upload, task, *args):
+    """Spools the upload to a temporary file and queues task on it; the task deletes the file when done."""
+    # The upload stream closes with the request, so the background job needs its own copy
+    spooled = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
+    try:
+        with spooled:
+            upload.save(spooled)
+        return job_queue.submit(task, spooled.name, *args)
+    except Exception:
+        os.remove(spooled.name)  # Nothing will pick the file up now
+        raise
+
+
+def parse_job_descriptions(raw):
+    """Parses the ``job_descriptions`` form field into ``(job_descriptions, roles)``.
+
+    Accepts a JSON list of job description strings, or of
+    ``{"role": ..., "job_description": ...}`` objects; roles are None unless
+    every entry names one. Raises ValueError for anything else.
+    """
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError:
+        entries = None
+    if not isinstance(entries, list) or not 0 < len(entries) <= MULTI_JD_MAX_ROLES:
+        raise ValueError(f'job_descriptions must be a JSON list of 1 to {MULTI_JD_MAX_ROLES} job descriptions')
+    job_descriptions, roles = [], []
+    for entry in entries:
+        if isinstance(entry, dict):
+            job_descriptions.append(entry.get('job_description'))
+            roles.append(entry.get('role'))
+        else:
+            job_descriptions.append(entry)
+            roles.append(None)
+    if not all(isinstance(jd, str) and jd.strip() for jd in job_descriptions):
+        raise ValueError('Every job description must be a non-empty string')
+    if all(isinstance(role, str) and role.strip() for role in roles):
+        if len(set(roles)) != len(roles):
+            raise ValueError('Role names must be unique')
+        return job_descriptions, roles
+    return job_descriptions, None
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Records total request latency per endpoint and status code."""
+    start = g.pop('request_start', None)
+    if start is not None and request.endpoint != 'get_metrics':
+        metrics.observe("smartscreen_request_seconds", time.perf_counter() - start,
+                        help="Total Flask request latency in seconds.",
+                        endpoint=request.endpoint or "unknown", status=response.status_code)
+    return response
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of stage timings, token counts, cache hit rates and errors."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_resume():
@@ -35,12 +138,15 @@ def analyze_resume():
         resume_file = request.files['resume']
         job_description = request.form['job_description']
 
-        resume_text = ats_backend.extract_text_from_pdf(resume_file)
-        ats_backend.set_job_description(job_description)
-        analysis = ats_backend.analyze_resume(resume_text, job_description)
+        session = ats_backend.new_session()
+        resume_text = session.extract_text_from_pdf(resume_file)
+        session.set_job_description(job_description)
+        analysis = session.analyze_resume(resume_text, job_description)
 
         return jsonify(analysis)
 
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Upload exceeds {MAX_UPLOAD_BYTES} bytes'}), 413
     except Exception as e:
         logging.error(f"An unexpected error occurred in /api/analyze: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred. Please try again later.'}), 500
@@ -55,16 +161,107 @@ def analyze_bulk_resumes():
         zip_file = request.files['resumes']
         job_description = request.form['job_description']
 
-        bulk_backend.extract_text_from_zip(zip_file)
-        results = bulk_backend.process_bulk_resumes(job_description)
+        job_id = submit_spooled(zip_file, run_bulk_job, job_description)
 
-        return jsonify(results)
+        return jsonify({
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+            'results_url': f'/api/jobs/{job_id}/results',
+        }), 202
 
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Upload exceeds {MAX_UPLOAD_BYTES} bytes'}), 413
     except Exception as e:
         logging.error(f"An unexpected error occurred in /api/bulk-analyze: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred. Please try again later.'}), 500
 
 
+@app.route('/api/bulk-analyze/multi', methods=['POST'])
+def analyze_bulk_resumes_multi_jd():
+    """Scores one ZIP of resumes against several job descriptions as a background job."""
+    try:
+        if 'resumes' not in request.files or 'job_descriptions' not in request.form:
+            return jsonify({'error': 'Missing resumes ZIP file or job descriptions'}), 400
+
+        try:
+            job_descriptions, roles = parse_job_descriptions(request.form['job_descriptions'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        job_id = submit_spooled(request.files['resumes'], run_multi_jd_job, job_descriptions, roles)
+
+        return jsonify({
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+            'results_url': f'/api/jobs/{job_id}/results',
+        }), 202
+
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Upload exceeds {MAX_UPLOAD_BYTES} bytes'}), 413
+    except Exception as e:
+        logging.error(f"An unexpected error occurred in /api/bulk-analyze/multi: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred. Please try again later.'}), 500
+
+
+@app.route('/api/bulk-analyze/stream', methods=['POST'])
+def stream_bulk_resumes():
+    """Streams one NDJSON record per resume as it finishes, followed by a summary record."""
+    try:
+        if 'resumes' not in request.files or 'job_description' not in request.form:
+            return jsonify({'error': 'Missing resumes ZIP file or job description'}), 400
+
+        job_description = request.form['job_description']
+        session = bulk_backend.new_session()
+        session.extract_text_from_zip(request.files['resumes'])
+        if not session.resumes_data:
+            return jsonify({'error': 'No resumes to process.'}), 400
+
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Upload exceeds {MAX_UPLOAD_BYTES} bytes'}), 413
+    except ZipLimitError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"An unexpected error occurred in /api/bulk-analyze/stream: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred. Please try again later.'}), 500
+
+    def generate():
+        start = time.time()
+        total = len(session.resumes_data)
+        counts = {}
+        try:
+            for index, row in session.iter_bulk_results(job_description):
+                counts[row['Suitability']] = counts.get(row['Suitability'], 0) + 1
+                yield json.dumps({'type': 'result', 'index': index, 'total': total, 'row': row}, default=str) + '\n'
+            yield json.dumps({'type': 'summary', 'total': total, 'suitability_counts': counts,
+                              'elapsed_seconds': round(time.time() - start, 3)}) + '\n'
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while streaming bulk results: {str(e)}")
+            yield json.dumps({'type': 'error', 'error': 'An unexpected error occurred. Please try again later.'}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})  # Stop proxies from buffering the stream
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == FAILED:
+        return jsonify({'error': job['error'], 'status': job['status']}), 500
+    if job['status'] != COMPLETED:
+        return jsonify({'status': job['status'], 'progress': job['progress']}), 409
+    return jsonify(job['results'])
+
+
 @app.route('/api/formatting-suggestions', methods=['POST'])
 def get_formatting_suggestions():
     try:
@@ -72,8 +269,9 @@ def get_formatting_suggestions():
             return jsonify({'error': 'Missing resume file'}), 400
 
         resume_file = request.files['resume']
-        resume_text = ats_backend.extract_text_from_pdf(resume_file)
-        suggestions = ats_backend.get_formatting_suggestions()
+        session = ats_backend.new_session()
+        resume_text = session.extract_text_from_pdf(resume_file)
+        suggestions = session.get_formatting_suggestions()
 
         return jsonify({'suggestions': suggestions})
 
@@ -91,11 +289,18 @@ def get_keyword_optimization():
         resume_file = request.files['resume']
         job_description = request.form['job_description']
 
-        resume_text = ats_backend.extract_text_from_pdf(resume_file)
-        ats_backend.set_job_description(job_description)
-        optimization = ats_backend.get_keyword_optimization()
+        session = ats_backend.new_session()
+        resume_text = session.extract_text_from_pdf(resume_file)
+        session.set_job_description(job_description)
+        keyword_match = session.get_keyword_match().to_dict()
+
+        # Keyword coverage alone is computed locally, without an LLM call
+        if request.form.get('local_only', '').lower() in ('1', 'true', 'yes'):
+            return jsonify({'keyword_match': keyword_match})
+
+        optimization = session.get_keyword_optimization()
 
-        return jsonify({'optimization': optimization})
+        return jsonify({'optimization': optimization, 'keyword_match': keyword_match})
 
     except Exception as e:
         logging.error(f"An unexpected error occurred in /api/keyword-optimization: {str(e)}")
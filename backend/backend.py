@@ -1,44 +1,295 @@
-import google.generativeai as genai
-import PyPDF2 as pdf
 from dotenv import load_dotenv
 import os
 import json
 from datetime import datetime
 import streamlit as st
 import logging
+import itertools
+import multiprocessing
+import time
 import zipfile
 import pandas as pd
-import shutil
-import pdfplumber
+import numpy as np
+import copy
 #import spacy
-from typing import List, Tuple, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import List, Tuple, Optional, Union
+from cache import TextCache, sha256_hex
+from compaction import compact_resume
+from dedup import DEDUP_NEAR_THRESHOLD, DuplicateIndex, band_keys, best_match
+from embeddings import get_semantic_scorer
+from job_profile import JobProfile, get_job_profile
+from keyword_engine import KeywordMatch, get_keyword_engine
+from llm_client import GEMINI_OUTPUT_TOKEN_LIMIT, estimate_tokens, get_llm_client
+from metrics import log_payload, metrics
+from pdf_extraction import PDF_MAX_TOKENS, PDF_STOP_AFTER_SECTIONS, extract_pdf, record_extraction
+from prescreen import bm25_scores
+from rate_limiter import BULK, llm_priority
+from result_store import ResultStore, resume_hash
+from zip_ingest import iter_zip_members
+from schemas import (BulkAnalysis, CombinedAnalysis, IndividualAnalysis, IndividualAssessment, InteractiveSuggestion,
+                     ParseMetrics, SchemaError, extract_json, parse_metrics, parse_with_repair, validator)
 
 # Load environment variables
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 logging.basicConfig(level=logging.INFO)
 
+# Maximum number of resumes analyzed concurrently in bulk mode
+BULK_MAX_WORKERS = int(os.getenv("BULK_MAX_WORKERS", "8"))
+# Worker processes used for PDF extraction and the per-file extraction timeout (seconds, 0 parses in-process without one)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "30"))
+# Workers are started from request and job threads, where fork could copy a lock another thread holds
+PDF_EXTRACT_START_METHOD = os.getenv(
+    "PDF_EXTRACT_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+# Batched bulk prompting: max resumes per prompt (1 disables batching) and token budget per prompt, output included
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1"))
+BULK_BATCH_TOKEN_BUDGET = int(os.getenv("BULK_BATCH_TOKEN_BUDGET", "100000"))
+# Output tokens reserved per candidate in a batched response
+BULK_BATCH_OUTPUT_TOKENS = 512
+# Resumes covering less than this share (0-100) of the JD's weighted keywords skip the LLM; 0 disables skipping
+PRESCREEN_THRESHOLD = float(os.getenv("PRESCREEN_THRESHOLD", "0"))
+PRESCREEN_REJECTED = "Not Suitable (pre-screen)"
+# Only this many resumes, the most similar to the JD by embedding, get the LLM analysis; 0 analyzes all of them
+BULK_SHORTLIST_SIZE = int(os.getenv("BULK_SHORTLIST_SIZE", "0"))
+SHORTLIST_REJECTED = "Not Suitable (not shortlisted)"
+# "llm": the LLM finds found/missing keywords; "local": they come from the local keyword engine and are given to the LLM
+KEYWORD_SOURCE = os.getenv("KEYWORD_SOURCE", "llm")
+# In "local" mode, JDs yielding fewer skills than this (e.g. prose JDs outside the tech vocabulary) use the LLM instead
+KEYWORD_MIN_JD_SKILLS = int(os.getenv("KEYWORD_MIN_JD_SKILLS", "3"))
+
+# Extracted text cache keyed by PDF hash; set TEXT_CACHE_DB to also persist it to a SQLite file
+text_cache = TextCache(
+    max_entries=int(os.getenv("TEXT_CACHE_SIZE", "256")),
+    db_path=os.getenv("TEXT_CACHE_DB") or None,
+    max_db_bytes=int(os.getenv("TEXT_CACHE_DB_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+# Completed bulk analyses, so re-submitted runs only process the remainder; set RESULT_STORE_DB="" to disable
+RESULT_STORE_DB = os.getenv("RESULT_STORE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_results.db"))
+# Stored analyses older than this many seconds are redone (0 = kept forever)
+RESULT_STORE_TTL = float(os.getenv("RESULT_STORE_TTL", str(30 * 24 * 3600)))
+# Part of the stored-analysis key with the model name; bump it when the bulk prompt, schema or compaction changes
+BULK_ANALYSIS_VERSION = "2"
+result_store = ResultStore(RESULT_STORE_DB, ttl=RESULT_STORE_TTL or None) if RESULT_STORE_DB else None
+
+
+def extract_text_from_pdf_bytes(data: bytes) -> str:
+    """Extracts text from in-memory PDF bytes with the configured engine (see ``pdf_extraction``)."""
+    result = extract_pdf(data)
+    record_extraction(result)
+    return result.text
+
+
+def text_cache_key(pdf_hash: str) -> str:
+    """Text cache key: the PDF's SHA-256 plus the extraction limits, since they change the extracted text."""
+    return f"{pdf_hash}:{PDF_MAX_TOKENS}:{','.join(PDF_STOP_AFTER_SECTIONS)}"
+
+
+def read_pdf_bytes(uploaded_file) -> bytes:
+    """Reads the full contents of a file path or file-like upload."""
+    if isinstance(uploaded_file, str):
+        with open(uploaded_file, "rb") as pdf_file:
+            return pdf_file.read()
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)  # The same upload may already have been read once
+    return uploaded_file.read()
+
+
+def extract_text_cached(data: bytes, cache: Optional[TextCache] = None) -> str:
+    """Extracts text from PDF bytes, reusing the cached result for identical content."""
+    cache = cache or text_cache
+    key = text_cache_key(sha256_hex(data))
+    text = cache.get(key)
+    if text is None:
+        with metrics.timer("pdf_extraction"):
+            text = extract_text_from_pdf_bytes(data)
+        cache.set(key, text)
+    return text
+
+
+def _terminate_executor(executor: ProcessPoolExecutor):
+    """Kills the worker processes of a pool whose tasks have hung."""
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _extraction_context():
+    """Multiprocessing context for extraction pools; the fork server preloads the extraction module."""
+    context = multiprocessing.get_context(PDF_EXTRACT_START_METHOD)
+    if PDF_EXTRACT_START_METHOD == "forkserver":
+        context.set_forkserver_preload(["pdf_extraction"])
+    return context
+
+
+def iter_extract_pdf_texts(members, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+    """Extracts (filename, pdf_bytes) pairs across worker processes.
+
+    Yields ``(filename, text, error)`` as each file finishes, in completion order.
+    ``members`` is consumed lazily, at most ``max_workers`` files ahead, so
+    only the files being parsed are held in memory.
+    A file still running ``timeout`` seconds after it started is reported with
+    a ``TimeoutError`` as soon as it goes over; the pool is killed and the other
+    files it was parsing are restarted in a fresh pool. A single file or a
+    single worker still goes through the pool so the timeout applies; only a
+    timeout of 0 parses the files in this process, without one.
+    """
+    max_workers = max(1, max_workers or PDF_EXTRACT_WORKERS)
+    timeout = timeout or PDF_EXTRACT_TIMEOUT
+    members = iter(members)
+    head = list(itertools.islice(members, 2))
+    members = itertools.chain(head, members)
+    if len(head) == 1:
+        max_workers = 1  # No point starting idle workers for one file
+
+    if timeout <= 0:
+        for filename, data in members:
+            try:
+                yield filename, extract_text_from_pdf_bytes(data), None
+            except Exception as e:
+                yield filename, None, e
+        return
+
+    context = _extraction_context()
+    queued = []  # Files to submit before reading on, e.g. those interrupted by a pool recycle
+    while True:
+        if not queued:
+            member = next(members, None)
+            if member is None:
+                return
+            queued.append(member)
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        in_flight = {}  # Future -> (filename, data, deadline)
+        overdue = []
+        try:
+            # Start every worker before any clock runs, so process startup never counts against a file
+            for future in [executor.submit(os.getpid) for _ in range(max_workers)]:
+                future.result()
+            # Keep at most max_workers tasks submitted so every in-flight task is actually running
+            while True:
+                while len(in_flight) < max_workers:
+                    member = queued.pop(0) if queued else next(members, None)
+                    if member is None:
+                        break
+                    filename, data = member
+                    in_flight[executor.submit(extract_pdf, data)] = (filename, data, time.monotonic() + timeout)
+                if not in_flight:
+                    break
+                next_deadline = min(deadline for _, _, deadline in in_flight.values())
+                done, _ = wait(in_flight, timeout=max(0.0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename, _, _ = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield filename, None, e
+                    else:
+                        record_extraction(result)  # Worker processes have their own metrics registry
+                        yield filename, result.text, None
+                now = time.monotonic()
+                overdue = [future for future, (_, _, deadline) in in_flight.items() if deadline <= now]
+                if overdue:
+                    break
+        finally:
+            if overdue:
+                _terminate_executor(executor)
+            else:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        if not overdue:
+            return
+        for future in overdue:
+            filename, _, _ = in_flight.pop(future)
+            yield filename, None, TimeoutError(f"PDF extraction exceeded {timeout} seconds")
+        queued.extend((filename, data) for filename, data, _ in in_flight.values())
+
+
+def uses_local_keywords(profile: JobProfile) -> bool:
+    """Whether found/missing keywords come from the local engine: "local" mode and enough skills in the JD."""
+    return KEYWORD_SOURCE == "local" and len(profile.skills) >= KEYWORD_MIN_JD_SKILLS
+
+
+def _collect_backend_metrics():
+    """Cache hit/miss, circuit breaker and structured-output parse gauges for the /api/metrics endpoint."""
+    caches = {"text": text_cache.stats(), "llm_response": get_llm_client().response_cache.stats()}
+    for cache_name, stats in caches.items():
+        for counter in ("hits", "misses", "size"):
+            yield (f"smartscreen_cache_{counter}", f"Cache {counter} per cache.", {"cache": cache_name}, stats[counter])
+        lookups = stats["hits"] + stats["misses"]
+        yield ("smartscreen_cache_hit_ratio", "Cache hit ratio per cache.", {"cache": cache_name},
+               stats["hits"] / lookups if lookups else 0.0)
+    breaker = get_llm_client().scheduler.breaker
+    yield ("smartscreen_llm_circuit_open", "1 while the LLM circuit breaker is open or half-open.", {},
+           int(breaker.state != breaker.CLOSED))
+    for schema_name, stats in parse_metrics.stats().items():
+        for outcome in ParseMetrics.OUTCOMES:
+            yield ("smartscreen_parse_outcomes", "Structured-output parse outcomes per schema.",
+                   {"schema": schema_name, "outcome": outcome}, stats[outcome])
+
+
+metrics.register_collector(_collect_backend_metrics)
+
+
 class ATSBackend:
-    def __init__(self):
-        self.model = genai.GenerativeModel('gemini-1.5-pro-latest')
+    def __init__(self, llm_client=None):
+        self.llm = llm_client or get_llm_client()  # Shared, thread-safe Gemini client
         self.resume_text = None
         self.job_description = None
-        
+
+    @property
+    def model(self):
+        """The configured Gemini model of the shared LLM client."""
+        return self.llm.model
+
+    def new_session(self, resume_text: Optional[str] = None, job_description: Optional[str] = None) -> "ATSBackend":
+        """Returns a request-scoped backend that shares the LLM client and caches but not resume/JD state.
+
+        A process-wide ATSBackend is shared by every request thread, so handlers
+        must set resume_text/job_description on a session, never on the shared instance.
+        """
+        session = copy.copy(self)
+        session.resume_text = resume_text
+        session.job_description = job_description
+        return session
+
+
+    @property
+    def prompt_resume_text(self):
+        """The session's resume text, compacted to the prompt token budget."""
+        return compact_resume(self.resume_text).text if self.resume_text else self.resume_text
+
+    @property
+    def prompt_job_description(self):
+        """The session's job description, compacted to the prompt token budget."""
+        return self.get_job_profile(self.job_description).prompt_text if self.job_description else self.job_description
+
+    def get_job_profile(self, job_description: str) -> JobProfile:
+        """Returns the cached JobProfile (prompt text, skills, term weights) for a job description."""
+        return get_job_profile(job_description, self.sanitize_input)
+
+    def get_keyword_match(self, resume_text: Optional[str] = None,
+                          job_description: Optional[str] = None) -> KeywordMatch:
+        """Matches the resume against the JD's keywords locally, without an LLM call (defaults to the session's texts)."""
+        resume_text = self.resume_text if resume_text is None else resume_text
+        job_description = self.job_description if job_description is None else job_description
+        with metrics.timer("keyword_match"):
+            return get_keyword_engine(self.get_job_profile(job_description)).match(resume_text)
+
+    def _keyword_context(self) -> str:
+        """The local keyword match for prompts in "local" keyword mode, otherwise nothing."""
+        if not self.resume_text or not self.job_description:
+            return ""
+        if not uses_local_keywords(self.get_job_profile(self.job_description)):
+            return ""
+        return self.get_keyword_match().to_prompt()
 
     def extract_text_from_pdf(self, uploaded_file):
         """Extracts text from an uploaded PDF file or file path."""
         try:
             # Accept both file path (str) and file-like object
-            if isinstance(uploaded_file, str):
-                pdf_file = open(uploaded_file, "rb")
-                close_after = True
-            else:
-                pdf_file = uploaded_file
-                close_after = False
-            with pdfplumber.open(pdf_file) as pdf:
-                text = "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-            if close_after:
-                pdf_file.close()
+            text = extract_text_cached(read_pdf_bytes(uploaded_file))
             self.resume_text = text
             logging.info("Text extracted successfully from PDF.")
             return text
@@ -46,28 +297,30 @@ class ATSBackend:
             logging.error(f"Error extracting text from PDF: {str(e)}")
             raise
 
+    def get_cache_stats(self) -> dict:
+        """Returns hit/miss counters for the extracted text and LLM response caches."""
+        return {"text": text_cache.stats(), "response": self.llm.response_cache.stats()}
+
     def set_job_description(self, jd):
         """Set the job description."""
         self.job_description = jd
 
-    def generate_prompt(self, prompt_template, max_retries=3):
-        """Generate a response from the model based on the provided prompt template."""
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(
-                    prompt_template,
-                    generation_config={
-                        "temperature": 0.5,  # Lower temperature for less randomness
-                        "max_output_tokens": 1024,
-                    }
-                )
-                return response.text
-            except Exception as e:
-                logging.error(f"Attempt {attempt + 1} failed: {str(e)}")
-                if attempt == max_retries - 1:
-                    raise Exception("Failed to generate content after multiple attempts. Please try again.") from e
-                import time
-                time.sleep(2 ** attempt)  # Exponential backoff
+    def generate_prompt(self, prompt_template):
+        """Generate a response from the model based on the provided prompt template.
+
+        Rate limiting and retries with backoff are handled by the LLM client's scheduler.
+        """
+        try:
+            return self.llm.generate(
+                prompt_template,
+                generation_config={
+                    "temperature": 0.5,  # Lower temperature for less randomness
+                    "max_output_tokens": 1024,
+                }
+            )
+        except Exception as e:
+            logging.error(f"Prompt generation failed: {str(e)}")
+            raise Exception("Failed to generate content after multiple attempts. Please try again.") from e
 
     def get_resume_analysis(self):
         """Get detailed resume analysis."""
@@ -98,8 +351,8 @@ class ATSBackend:
         **Recommendations:**
         Provide 3-4 specific, actionable recommendations
 
-        Resume: {self.resume_text}
-        Job Description: {self.job_description}
+        Resume: {self.prompt_resume_text}
+        Job Description: {self.prompt_job_description}
         """
         return self.generate_prompt(prompt)
 
@@ -123,8 +376,8 @@ class ATSBackend:
         **Final Assessment:**
         [2-3 sentences with final thoughts and key recommendations]
 
-        Resume: {self.resume_text}
-        Job Description: {self.job_description}
+        Resume: {self.prompt_resume_text}
+        Job Description: {self.prompt_job_description}
         """
         return self.generate_prompt(prompt)
 
@@ -162,14 +415,13 @@ class ATSBackend:
             [Provide 3-4 specific recommendations for improving the resume]
 
             Resume:
-            {self.resume_text}
+            {self.prompt_resume_text}
 
             Job Description:
-            {self.job_description}
+            {self.prompt_job_description}
             """
             
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.llm.generate(prompt)
         except Exception as e:
             raise Exception(f"Error in quick analysis: {str(e)}")
 
@@ -200,14 +452,13 @@ class ATSBackend:
             [Your recommendations here]
 
             Resume:
-            {self.resume_text}
+            {self.prompt_resume_text}
 
             Job Description:
-            {self.job_description}
+            {self.prompt_job_description}
             """
             
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.llm.generate(prompt)
         except Exception as e:
             raise Exception(f"Error in detailed review: {str(e)}")
 
@@ -228,14 +479,13 @@ class ATSBackend:
             **Final Thoughts:** [Brief conclusion]
 
             Resume:
-            {self.resume_text}
+            {self.prompt_resume_text}
 
             Job Description:
-            {self.job_description}
+            {self.prompt_job_description}
             """
             
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.llm.generate(prompt)
         except Exception as e:
             raise Exception(f"Error in match score calculation: {str(e)}")
 
@@ -275,11 +525,10 @@ class ATSBackend:
             **Optimization Tips:**
             [List 3-4 specific formatting improvements]
 
-            Resume: {self.resume_text}
+            Resume: {self.prompt_resume_text}
             """
             
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.llm.generate(prompt)
         except Exception as e:
             raise Exception(f"Error in formatting analysis: {str(e)}")
 
@@ -302,12 +551,14 @@ class ATSBackend:
             **Placement Suggestions:**
             [Specific suggestions for keyword placement]
 
-            Resume: {self.resume_text}
-            Job Description: {self.job_description}
+            Resume: {self.prompt_resume_text}
+            Job Description: {self.prompt_job_description}
+
+            {self._keyword_context()}
             """
             
-            response = self.model.generate_content(prompt)
-            formatted_response = self.format_response(response.text)  # Format the response
+            response_text = self.llm.generate(prompt)
+            formatted_response = self.format_response(response_text)  # Format the response
             return formatted_response
         except Exception as e:
             raise Exception(f"Error in keyword optimization: {str(e)}")
@@ -334,28 +585,21 @@ class ATSBackend:
                 }}
             ]
 
-            Resume: {self.resume_text}
-            Job Description: {self.job_description}
+            Resume: {self.prompt_resume_text}
+            Job Description: {self.prompt_job_description}
             """
 
-            response = self.model.generate_content(prompt)
-            logging.info(f"Raw response from model: {response.text}")
+            response_text = self.llm.generate(prompt, json_mode=True,
+                                              validate=validator(InteractiveSuggestion, many=True))
+            log_payload("Raw response from model", response_text)
 
             try:
-                suggestions = json.loads(response.text)  # Load response as JSON
-            except json.JSONDecodeError as e:
-                logging.error(f"Failed to decode JSON from LLM: {e}")
+                suggestions = parse_with_repair(response_text, InteractiveSuggestion, many=True,
+                                                repair=self._repair_response)
+            except SchemaError as e:
+                logging.error(f"Invalid suggestions JSON from LLM: {e}")
                 raise Exception("The LLM returned an invalid JSON format. Please try again.")
-
-            # Validate the structure of the suggestions
-            if not isinstance(suggestions, list):
-                raise Exception("The LLM did not return a JSON array.")
-            for suggestion in suggestions:
-                if not isinstance(suggestion, dict):
-                    raise Exception("Each suggestion must be a JSON object.")
-                if not all(key in suggestion for key in ["section", "line_content", "suggestion", "reason"]):
-                    raise Exception("Each suggestion must have 'section', 'line_content', 'suggestion', and 'reason' keys.")
-            return {"suggestions": suggestions}
+            return {"suggestions": [suggestion.to_display() for suggestion in suggestions]}
 
         except Exception as e:
             logging.error(f"Error in interactive suggestions: {str(e)}")
@@ -383,12 +627,76 @@ class ATSBackend:
         **Customization Tips:**
         [3-4 specific tips to customize the template]
 
-        Job Description: {self.job_description}
-        Current Resume Format: {self.resume_text}
+        Job Description: {self.prompt_job_description}
+        Current Resume Format: {self.prompt_resume_text}
         """
         
-        response = self.model.generate_content(prompt)
-        return response.text
+        return self.llm.generate(prompt)
+
+    def get_combined_analysis(self):
+        """Get suitability, keyword, formatting and overall review sections from a single LLM call.
+
+        Identical resume/JD pairs are answered from the LLM response cache. If the
+        combined response cannot be parsed, the four separate analyses are issued
+        concurrently instead.
+        """
+        prompt = f"""
+        You are an experienced Technical Human Resource Manager and ATS expert. Review the resume
+        against the job description and return ONLY a JSON object with the following keys:
+
+        * match_percentage: the overall percentage match between the resume and the job description (0-100).
+        * suitability: one of "Suitable", "Potentially Suitable" or "Not Suitable".
+        * reason: 2-3 sentences explaining the suitability decision.
+        * keyword_analysis: a markdown string with the overall keyword optimization score, the current
+          industry keywords found, recommended keywords from the job description and placement suggestions.
+        * formatting_review: a markdown string assessing file format, layout, headers & sections,
+          fonts & styling, and listing 3-4 specific formatting improvements.
+        * resume_review: a markdown string with present, missing and additional skills, 3-4 key strengths,
+          2-3 areas for improvement and 3-4 specific, actionable recommendations.
+
+        Resume: {self.prompt_resume_text}
+        Job Description: {self.prompt_job_description}
+
+        {self._keyword_context()}
+        """
+        try:
+            response_text = self.llm.generate(prompt, generation_config={"max_output_tokens": 4096}, json_mode=True,
+                                              validate=validator(CombinedAnalysis))
+            analysis = parse_with_repair(response_text, CombinedAnalysis, repair=self._repair_response)
+            return {
+                "Match Percentage": analysis.match_percentage,
+                "Suitability": analysis.suitability,
+                "Reason": analysis.reason,
+                "Keyword Analysis": self.format_response(analysis.keyword_analysis),
+                "Formatting Review": analysis.formatting_review,
+                "Resume Review": analysis.resume_review,
+            }
+        except SchemaError as e:
+            logging.warning(f"Combined analysis could not be parsed, falling back to separate calls: {e}")
+            return self._get_combined_analysis_concurrently()
+
+    def _get_combined_analysis_concurrently(self):
+        """Issues the four individual analyses in parallel and merges them into the combined shape."""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            suitability = executor.submit(self.analyze_resume, self.resume_text, self.job_description)
+            keywords = executor.submit(self.get_keyword_optimization)
+            formatting = executor.submit(self.get_formatting_suggestions)
+            review = executor.submit(self.get_resume_analysis)
+            suitability_analysis = suitability.result()
+
+        match_percentage = str(suitability_analysis["Match Percentage"])
+        try:
+            match_score = float(match_percentage.replace("%", "").strip())
+        except ValueError:
+            match_score = 0
+        return {
+            "Match Percentage": match_percentage,
+            "Suitability": self.determine_suitability(match_score),
+            "Reason": "; ".join(suitability_analysis["Key Strengths"]),
+            "Keyword Analysis": keywords.result(),
+            "Formatting Review": formatting.result(),
+            "Resume Review": review.result(),
+        }
 
     def format_response(self, response_text):
         """Format the response text for better readability."""
@@ -415,57 +723,93 @@ class ATSBackend:
         else:
             return "Not Suitable"
 
-    def analyze_resume(self, resume_text: str, job_description: str, is_bulk: bool = False) -> dict:
-        """Analyzes a single resume against the job description using AI."""
+    def analyze_resume(self, resume_text: str, job_description: Union[str, JobProfile], is_bulk: bool = False) -> dict:
+        """Analyzes a single resume against the job description using AI.
+
+        Bulk callers pass the run's JobProfile so the JD is not re-processed per resume.
+        """
         try:
             # Ensure resume_text is a string before proceeding
             if not isinstance(resume_text, str):
                 logging.error(f"Invalid resume_text type: {type(resume_text)}. Expected str.")
                 raise ValueError("Invalid resume_text type. Expected a string.")
 
-            logging.info(f"Analyzing resume: {resume_text[:500]}")  
+            log_payload("Analyzing resume", resume_text[:500])
+
+            # The JD profile already holds the compacted, sanitized JD
+            profile = job_description if isinstance(job_description, JobProfile) else self.get_job_profile(job_description)
+            job_description = profile.prompt_text
+
+            # Found/missing keywords are matched locally and handed to the LLM
+            keyword_match = None
+            if not is_bulk and uses_local_keywords(profile):
+                with metrics.timer("keyword_match"):
+                    keyword_match = get_keyword_engine(profile).match(resume_text)
+
+            # Normalize, deduplicate and trim the resume to its prompt token budget
+            with metrics.timer("compaction"):
+                resume_text = compact_resume(resume_text).text
 
             # Sanitize inputs to avoid issues with special characters
-            resume_text = self.sanitize_input(resume_text)
-            job_description = self.sanitize_input(job_description)
+            with metrics.timer("sanitization"):
+                resume_text = self.sanitize_input(resume_text)
 
             # Generate the prompt for the AI model
-            if is_bulk:
-                prompt = self.generate_bulk_analysis_prompt(resume_text, job_description)
-            else:
-                prompt = f"""You are an expert recruiter tasked with determining if a candidate is suitable for a position.
-                You are given a job description and a resume.
-                Based on the resume and the job description, provide a detailed suitability assessment. Return the response as a JSON object.
-                The JSON object should contain the following keys:
-                * match_percentage: A string representing the percentage match between the resume and the job description (0-100).
-                * found_keywords: A list of keywords found in the resume.
-                * missing_keywords: A list of essential keywords missing from the resume.
-                * key_strengths: A list of the main strengths of the candidate.
-                * areas_for_improvement: A list of key areas where the resume could be enhanced.
-                * resume_formatting_tips: A list of specific suggestions for making the resume more ATS-friendly.
-                Job Description: {job_description}
-                Resume: {resume_text}"""
+            with metrics.timer("prompt_build"):
+                prompt = self._build_analysis_prompt(resume_text, job_description, is_bulk, keyword_match)
 
-            # Get the LLM response
-            response_text = self._get_llm_response(prompt)
+            # Get the LLM response; responses that do not match the schema are kept out of the cache
+            schema = BulkAnalysis if is_bulk else IndividualAssessment if keyword_match is not None else IndividualAnalysis
+            response_text = self._get_llm_response(prompt, json_mode=True, validate=validator(schema))
 
             # Log the raw response
-            logging.info(f"Raw LLM Response: {response_text}")
+            log_payload("Raw LLM Response", response_text)
 
             if not response_text:
                 logging.error("Received an empty response from the model.")
                 raise ValueError("Received an empty response from the model.")
 
             # Parse the response based on the type of analysis
-            if is_bulk:
-                return self.parse_bulk_analysis_response(response_text)
-            else:
-                return self.parse_individual_analysis_response(response_text)
+            with metrics.timer("parse"):
+                if is_bulk:
+                    return self.parse_bulk_analysis_response(response_text)
+                else:
+                    return self.parse_individual_analysis_response(response_text, keyword_match)
 
         except Exception as e:
             logging.exception(f"Error during analyze_resume: {e}")
             raise
 
+    def _build_analysis_prompt(self, resume_text: str, job_description: str, is_bulk: bool,
+                               keyword_match: Optional[KeywordMatch] = None) -> str:
+        """Builds the bulk or individual analysis prompt for sanitized inputs."""
+        if is_bulk:
+            return self.generate_bulk_analysis_prompt(resume_text, job_description)
+        if keyword_match is not None:
+            return f"""You are an expert recruiter tasked with determining if a candidate is suitable for a position.
+                You are given a job description, a resume and a keyword match that has already been computed.
+                Based on them, provide a detailed suitability assessment. Return the response as a JSON object.
+                The JSON object should contain the following keys:
+                * match_percentage: A number representing the percentage match between the resume and the job description (0-100).
+                * key_strengths: A list of the main strengths of the candidate.
+                * areas_for_improvement: A list of key areas where the resume could be enhanced, including the missing keywords that matter most.
+                * resume_formatting_tips: A list of specific suggestions for making the resume more ATS-friendly.
+                Job Description: {job_description}
+                Resume: {resume_text}
+                {keyword_match.to_prompt()}"""
+        return f"""You are an expert recruiter tasked with determining if a candidate is suitable for a position.
+                You are given a job description and a resume.
+                Based on the resume and the job description, provide a detailed suitability assessment. Return the response as a JSON object.
+                The JSON object should contain the following keys:
+                * match_percentage: A string representing the percentage match between the resume and the job description (0-100).
+                * found_keywords: A list of keywords found in the resume.
+                * missing_keywords: A list of essential keywords missing from the resume.
+                * key_strengths: A list of the main strengths of the candidate.
+                * areas_for_improvement: A list of key areas where the resume could be enhanced.
+                * resume_formatting_tips: A list of specific suggestions for making the resume more ATS-friendly.
+                Job Description: {job_description}
+                Resume: {resume_text}"""
+
     def shorten_text(self, text: str, max_length: int = 150) -> str:
         """Shortens the text to a specified maximum length."""
         if len(text) > max_length:
@@ -476,15 +820,6 @@ class ATSBackend:
         """Sanitize input text to remove problematic characters."""
         return text.replace("&", "&").replace("<", "<").replace(">", ">")
 
-    def clean_json_response(self, response_text: str) -> str:
-        """Cleans the JSON response text to ensure it is valid JSON."""
-        # Remove any extraneous characters before and after the JSON object
-        start = response_text.find("{")
-        end = response_text.rfind("}")
-        if start != -1 and end != -1:
-            return response_text[start:end + 1]
-        return "{}"  # Return an empty JSON object if no valid JSON found
-
     def generate_bulk_analysis_prompt(self, resume_text: str, job_description: str) -> str:
         """Generates a prompt for bulk resume analysis."""
         return f"""Based on a careful comparison of the job description and the resume, please provide a concise evaluation. Your evaluation should include:
@@ -497,19 +832,11 @@ class ATSBackend:
 
 4. **Match Percentage:** Estimate the overall percentage match between the candidate's qualifications and the job requirements. Provide a single percentage value (e.g., "75%").
 
-Your response should be formatted as follows:
-
-**Suitability Assessment:** [Suitable/Not Suitable]
-**Key Strengths:**
-- [Strength 1]: [Explanation of alignment]
-- [Strength 2]: [Explanation of alignment]
-- [Strength 3]: [Explanation of alignment]
-
-**Areas for Improvement:**
-- [Area 1]
-- [Area 2]
-
-**Match Percentage:** [Percentage]%
+Return ONLY a JSON object with the following keys:
+* suitability: either "Suitable" or "Not Suitable".
+* key_strengths: a list of 2-3 strings, each formatted as "[Strength]: [Explanation of alignment]".
+* areas_for_improvement: a list of 1-2 strings.
+* match_percentage: the overall percentage match as a number between 0 and 100.
 
 Please provide an objective and data-driven assessment, focusing on concrete skills and experience rather than subjective interpretations.
 
@@ -520,193 +847,566 @@ And here's the candidate's resume:
 {resume_text}
 """
 
-    def _get_llm_response(self, prompt: str) -> str:
-        """Helper function to get the LLM response. Abstract this out so you can swap implementations."""
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment.")
+    def _get_llm_response(self, prompt: str, json_mode: bool = False, validate=None) -> str:
+        """Helper function to get the LLM response through the shared LLM client."""
+        return self.llm.generate(prompt, json_mode=json_mode, validate=validate)
 
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("Gemini 2.0 Flash")  
+    def _repair_response(self, repair_prompt: str, validate=None) -> str:
+        """Sends a schema repair re-prompt; it carries only the bad output, not the resume or JD."""
+        return self.llm.generate(repair_prompt, generation_config={"temperature": 0}, json_mode=True,
+                                 validate=validate)
+
+    def get_parse_stats(self) -> dict:
+        """Returns structured-output parse outcomes and failure rates per schema."""
+        return parse_metrics.stats()
 
-        try:
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            logging.error(f"LLM generation failed: {e}")  # Log LLM failures specifically
-            raise  
     def parse_bulk_analysis_response(self, response_text: str) -> dict:
-        """Parses the text response from the LLM based on the bulk analysis prompt."""
+        """Parses the JSON response from the LLM based on the bulk analysis prompt."""
         try:
-            # Split the response into sections
-            sections = response_text.split('\n\n')
-
-           
-            analysis = {}
-
-            # Extract Suitability Assessment
-            for section in sections:
-                if section.startswith("**Suitability Assessment:**"):
-                    analysis["Suitability"] = section.split('**Suitability Assessment:**')[1].strip()
-                    break
-            else:
-                analysis["Suitability"] = "N/A"  # If not found
-
-            # Extract Key Strengths
-            analysis["Key Strengths"] = []
-            for section in sections:
-                if section.startswith("**Key Strengths:**"):
-                    strengths = section.split('**Key Strengths:**')[1].strip().split('\n- ')
-                   
-                    if strengths and strengths[0] == '':
-                        strengths.pop(0)  # This is crucial for avoiding the extra empty element!
-                    analysis["Key Strengths"] = [s.strip() for s in strengths]  # Store as a list of strings
-                    break
-            else:
-                analysis["Key Strengths"] = []  # If not found
-
-            # Extract Areas for Improvement
-            analysis["Areas for Improvement"] = []
-            for section in sections:
-                if section.startswith("**Areas for Improvement:**"):
-                    improvements = section.split('**Areas for Improvement:**')[1].strip().split('\n- ')
-                    # Remove the first empty element if it exists
-                    if improvements and improvements[0] == '':
-                        improvements.pop(0)  # This is crucial for avoiding the extra empty element!
-                    analysis["Areas for Improvement"] = [i.strip() for i in improvements]  # Store as a list of strings
-                    break
-            else:
-                analysis["Areas for Improvement"] = []  # If not found
-
-            # Extract Match Percentage
-            for section in sections:
-                if section.startswith("**Match Percentage:**"):
-                    match_percentage = section.split('**Match Percentage:**')[1].strip()
-                    analysis["Match Percentage"] = match_percentage.replace('%', '') if match_percentage else "N/A"
-                    break
-            else:
-                analysis["Match Percentage"] = "N/A"  # If not found
-
-            return analysis
-
-        except Exception as e:
+            return parse_with_repair(response_text, BulkAnalysis, repair=self._repair_response).to_display()
+        except SchemaError as e:
             logging.error(f"Error parsing LLM response: {e}")
             # Log the raw response for debugging
             logging.debug(f"Raw response from LLM: {response_text}")
             raise ValueError(f"Could not parse LLM response: {e}")
 
-    def parse_individual_analysis_response(self, response_text: str) -> dict:
-        """Parses the JSON response text from the LLM based on the individual analysis prompt."""
+    def parse_individual_analysis_response(self, response_text: str,
+                                           keyword_match: Optional[KeywordMatch] = None) -> dict:
+        """Parses the JSON response text from the LLM based on the individual analysis prompt.
+
+        With a local keyword match, found/missing keywords come from it rather than from the LLM.
+        """
         try:
-            # Clean the response to remove any extraneous characters
-            cleaned_response = self.clean_json_response(response_text)
-
-            # Attempt to parse the cleaned response
-            analysis = json.loads(cleaned_response)
-
-            # Check for expected keys in the response
-            expected_keys = ['match_percentage', 'found_keywords', 'missing_keywords', 'key_strengths', 'areas_for_improvement', 'resume_formatting_tips']
-            for key in expected_keys:
-                if key not in analysis:
-                    logging.error(f"Response is missing expected key: {key}")
-                    raise ValueError(f"Response is missing required key: {key}")
-
-            # Format the output for better readability
-            formatted_analysis = {
-                "Match Percentage": analysis["match_percentage"],
-                "Found Keywords": analysis["found_keywords"],
-                "Missing Keywords": analysis["missing_keywords"],
-                "Key Strengths": analysis["key_strengths"],
-                "Areas for Improvement": analysis["areas_for_improvement"],
-                "Resume Formatting & Optimization Tips": analysis["resume_formatting_tips"]
-            }
+            if keyword_match is not None:
+                assessment = parse_with_repair(response_text, IndividualAssessment, repair=self._repair_response)
+                return assessment.to_display(keyword_match.found + keyword_match.found_optional,
+                                             keyword_match.missing + keyword_match.missing_optional)
+            analysis = parse_with_repair(response_text, IndividualAnalysis, repair=self._repair_response)
+            return analysis.to_display()  # Format the output for better readability
+        except SchemaError as e:
+            logging.error(f"Error decoding JSON response from LLM: {e}, Raw Response: {response_text}")
+            raise ValueError(f"Error decoding JSON response: {e}")
 
-            return formatted_analysis  # Return the formatted analysis
 
-        except json.JSONDecodeError as e:
-            logging.error(f"Error decoding JSON response from LLM: {e}, Raw Response: {cleaned_response}")
-            raise ValueError(f"Error decoding JSON response: {e}")
+def match_percentage(row: dict) -> Optional[float]:
+    """The row's match percentage as a number, or None when the resume was not scored (e.g. "N/A")."""
+    try:
+        return float(str(row.get("Match Percentage")).replace("%", "").strip())
+    except ValueError:
+        return None
+
+
+def build_matrix_row(filename: str, role_rows: dict) -> dict:
+    """One candidate x role matrix row from the candidate's result row per role, in role order.
+
+    "Best Fit Role" is the role with the highest match percentage, the first
+    one on ties, or None when no role produced a score.
+    """
+    scores = {role: match_percentage(row) for role, row in role_rows.items()}
+    scored = {role: score for role, score in scores.items() if score is not None}
+    best = max(scored, key=scored.get) if scored else None
+    return {
+        "filename": filename,
+        "Match Percentages": scores,
+        "Best Fit Role": best,
+        "Best Match Percentage": scored.get(best),
+        "Roles": role_rows,
+    }
+
 
 class BulkATSBackend:
-    def __init__(self, ats_backend: ATSBackend):
+    def __init__(self, ats_backend: ATSBackend, result_store: Optional[ResultStore] = result_store):
         self.resumes_data: List[Tuple[str, str]] = []  # Store extracted resume texts
         self.ats_backend = ats_backend  
+        self.result_store = result_store  # None disables resuming from earlier runs
 
+    def new_session(self) -> "BulkATSBackend":
+        """Returns an empty request-scoped bulk backend sharing the same ATSBackend.
 
-    def extract_text_from_zip(self, uploaded_file):
-        """Extract text from uploaded ZIP file containing resumes."""
-        temp_dir = "temp_resumes"
-        os.makedirs(temp_dir, exist_ok=True)
-
-        try:
-            if not zipfile.is_zipfile(uploaded_file):
-                raise ValueError("Invalid ZIP file format")
+        resumes_data belongs to one upload; reusing a bulk backend across uploads
+        would re-score every resume it has ever seen.
+        """
+        return BulkATSBackend(self.ats_backend, self.result_store)
 
-            with zipfile.ZipFile(uploaded_file, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
+    def extract_text_from_zip(self, uploaded_file, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        """Extract text from uploaded ZIP file containing resumes.
 
-            for filename in os.listdir(temp_dir):
-                sanitized_filename = os.path.basename(filename)  # Sanitize filename
-                file_path = os.path.join(temp_dir, sanitized_filename)
-                if sanitized_filename.endswith('.pdf'):
-                    try:
-                        # Use ATSBackend's extract_text_from_pdf
-                        text = self.ats_backend.extract_text_from_pdf(file_path)
-                        if text:  # Check if text is not empty
-                            self.resumes_data.append((sanitized_filename, text))  # Store extracted text as a tuple
-                            logging.info(f"Successfully extracted text from {sanitized_filename}.")
-                        else:
-                            logging.warning(f"No text extracted from {sanitized_filename}. Skipping.")
-                    except Exception as e:
-                        logging.error(f"Error processing PDF {sanitized_filename}: {e}")
+        PDF members anywhere in the archive are streamed one at a time within the
+        ``zip_ingest`` limits (filenames keep their folder, e.g. "team-a/jane.pdf")
+        and parsed in a process pool; see ``iter_extract_pdf_texts`` for the
+        timeout behaviour. Raises ``zip_ingest.ZipLimitError`` for archives over
+        the entry-count or total-size limits.
+        """
+        if not zipfile.is_zipfile(uploaded_file):
+            raise ValueError("Invalid ZIP file format")
+
+        with metrics.timer("zip_extraction"):
+            self._extract_members(uploaded_file, max_workers, timeout)
+
+    def _extract_members(self, uploaded_file, max_workers: Optional[int], timeout: Optional[float]):
+        finished = {}  # Cache key -> (text, error) of PDFs already extracted from this archive
+        waiting = {}  # Cache key -> filenames of identical PDFs whose extraction is in flight
+
+        def pending():
+            # Previously seen PDFs are served from the text cache; the rest go to the pool once per hash
+            for sanitized_filename, member, error in iter_zip_members(uploaded_file):
+                if error is not None:
+                    self._store_extracted_text(sanitized_filename, None, error)
+                    continue
+                with member:
+                    key = text_cache_key(member.sha256)
+                    if key in waiting:
+                        waiting[key].append(sanitized_filename)
+                        continue
+                    cached = text_cache.get(key) if key not in finished else None
+                    if cached is not None:
+                        finished[key] = (cached, None)
+                    if key in finished:
+                        self._store_extracted_text(sanitized_filename, *finished[key])
+                        continue
+                    waiting[key] = [sanitized_filename]
+                    data = member.read()  # Only files handed to the pool are held in memory
+                yield key, data
+
+        for key, text, error in iter_extract_pdf_texts(pending(), max_workers, timeout):
+            if error is None:
+                text_cache.set(key, text)
+            finished[key] = (text, error)
+            for sanitized_filename in waiting.pop(key):
+                self._store_extracted_text(sanitized_filename, text, error)
+
+    def _store_extracted_text(self, sanitized_filename: str, text: Optional[str], error: Optional[Exception]):
+        """Records one extraction outcome in resumes_data."""
+        if error is not None:
+            logging.error(f"Error processing PDF {sanitized_filename}: {error}")
+        elif text:  # Check if text is not empty
+            self.resumes_data.append((sanitized_filename, text))  # Store extracted text as a tuple
+            logging.info(f"Successfully extracted text from {sanitized_filename}.")
+        else:
+            logging.warning(f"No text extracted from {sanitized_filename}. Skipping.")
+
+    def process_bulk_resumes(self, job_description, max_workers: Optional[int] = None,
+                             batch_size: Optional[int] = None, token_budget: Optional[int] = None,
+                             prescreen_threshold: Optional[float] = None, shortlist_size: Optional[int] = None):
+        """Processes all uploaded resumes against the job description and determine suitability.
+
+        Resumes are analyzed concurrently with at most ``max_workers`` LLM calls in
+        flight (defaults to ``BULK_MAX_WORKERS``). Results keep the input order.
+        With ``batch_size`` > 1 (defaults to ``BULK_BATCH_SIZE``) up to that many
+        resumes share one prompt and one copy of the job description, see
+        ``plan_batches``. Every resume first gets a local BM25 "Pre-screen Score";
+        resumes scoring below ``prescreen_threshold`` (defaults to
+        ``PRESCREEN_THRESHOLD``) are rejected without an LLM call and the rest
+        are analyzed best-first. With ``shortlist_size`` > 0 (defaults to
+        ``BULK_SHORTLIST_SIZE``) the remaining resumes also get an embedding
+        "Semantic Score" and only the top ``shortlist_size`` of them are analyzed.
+        Duplicate resumes, identical or near-identical (``dedup``) to one earlier
+        in the upload or to one analyzed in an earlier run, reuse that analysis
+        and name the original in their "duplicate_of" column.
+        """
+        results = [None] * len(self.resumes_data)
+        for index, row in self.iter_bulk_results(job_description, max_workers, batch_size, token_budget,
+                                                 prescreen_threshold, shortlist_size):
+            results[index] = row
+        return results  # Return the list of dictionaries
 
-        finally:
-            # Guaranteed cleanup
-            shutil.rmtree(temp_dir, ignore_errors=True)  # Add ignore_errors
+    def iter_bulk_results(self, job_description, max_workers: Optional[int] = None,
+                          batch_size: Optional[int] = None, token_budget: Optional[int] = None,
+                          prescreen_threshold: Optional[float] = None, shortlist_size: Optional[int] = None):
+        """Yields ``(index, row)`` for each resume as soon as its analysis finishes.
 
-    def process_bulk_resumes(self, job_description):
-        """Processes all uploaded resumes against the job description and determine suitability."""
+        ``index`` is the resume's position in ``resumes_data``; see
+        ``process_bulk_resumes`` for the parameters.
+        """
         if not self.resumes_data:
             logging.error("No resumes to process.")
             raise ValueError("No resumes to process.")
 
         logging.info(f"Processing {len(self.resumes_data)} resumes.")  # Log the number of resumes being processed
 
-        results = []  # Initialize an empty list to hold results
-        for filename, resume_text in self.resumes_data:
+        max_workers = max_workers or BULK_MAX_WORKERS
+        batch_size = batch_size or BULK_BATCH_SIZE
+        threshold = PRESCREEN_THRESHOLD if prescreen_threshold is None else prescreen_threshold
+        shortlist_size = BULK_SHORTLIST_SIZE if shortlist_size is None else shortlist_size
+        resumes = list(self.resumes_data)
+        unique, copies, signatures = self._find_duplicates(resumes)
+        hashes = [resume_hash(resume_text) for _, resume_text in resumes]
+
+        rows, batches, work = self._plan_unique(resumes, unique, signatures, hashes, job_description, batch_size,
+                                                token_budget, threshold, shortlist_size)
+        analyzed = (pair for _, pairs in self._run_batches([(None, work, batch) for batch in batches], max_workers)
+                    for pair in pairs)
+        for index, row in itertools.chain(rows, analyzed):
+            yield from self._with_copies(index, row, resumes, copies)
+
+    def process_multi_jd_bulk(self, job_descriptions: List[str], roles: Optional[List[str]] = None,
+                              max_workers: Optional[int] = None, batch_size: Optional[int] = None,
+                              token_budget: Optional[int] = None, prescreen_threshold: Optional[float] = None,
+                              shortlist_size: Optional[int] = None) -> List[dict]:
+        """Scores every uploaded resume against several job descriptions; returns one matrix row per resume.
+
+        See ``iter_multi_jd_results`` for the rows and ``process_bulk_resumes``
+        for the other parameters.
+        """
+        results = [None] * len(self.resumes_data)
+        for index, row in self.iter_multi_jd_results(job_descriptions, roles, max_workers, batch_size, token_budget,
+                                                     prescreen_threshold, shortlist_size):
+            results[index] = row
+        return results
+
+    def iter_multi_jd_results(self, job_descriptions: List[str], roles: Optional[List[str]] = None,
+                              max_workers: Optional[int] = None, batch_size: Optional[int] = None,
+                              token_budget: Optional[int] = None, prescreen_threshold: Optional[float] = None,
+                              shortlist_size: Optional[int] = None):
+        """Yields ``(index, row)`` for each resume once it has been scored against every job description.
+
+        The resume pool is extracted, deduplicated and hashed once; each role
+        then gets its own profile, pre-screen, shortlist and batches, and the
+        batches of all roles share one pool of ``max_workers`` LLM calls,
+        interleaved so every role progresses together. ``roles`` names the job
+        descriptions (defaults to "Role 1", "Role 2", ...). Each row is a
+        candidate x role matrix row, see ``build_matrix_row``.
+        """
+        if not self.resumes_data:
+            logging.error("No resumes to process.")
+            raise ValueError("No resumes to process.")
+        roles = list(roles) if roles else [f"Role {number}" for number in range(1, len(job_descriptions) + 1)]
+        if not job_descriptions or len(roles) != len(job_descriptions) or len(set(roles)) != len(roles):
+            raise ValueError("Expected at least one job description and one unique role name per job description")
+
+        logging.info(f"Processing {len(self.resumes_data)} resumes against {len(roles)} job descriptions.")
+
+        max_workers = max_workers or BULK_MAX_WORKERS
+        batch_size = batch_size or BULK_BATCH_SIZE
+        threshold = PRESCREEN_THRESHOLD if prescreen_threshold is None else prescreen_threshold
+        shortlist_size = BULK_SHORTLIST_SIZE if shortlist_size is None else shortlist_size
+        resumes = list(self.resumes_data)
+        unique, copies, signatures = self._find_duplicates(resumes)
+        hashes = [resume_hash(resume_text) for _, resume_text in resumes]
+
+        scored = {index: {} for index in range(len(resumes))}  # Resume -> role -> row, until every role is in
+
+        def collect(role, index, row):
+            for position, result in self._with_copies(index, row, resumes, copies):
+                scored[position][role] = result
+                if len(scored[position]) == len(roles):
+                    role_rows = scored.pop(position)
+                    yield position, build_matrix_row(result["filename"], {name: role_rows[name] for name in roles})
+
+        plans = []
+        for role, job_description in zip(roles, job_descriptions):
+            rows, batches, work = self._plan_unique(resumes, unique, signatures, hashes, job_description,
+                                                    batch_size, token_budget, threshold, shortlist_size)
+            for index, row in rows:
+                yield from collect(role, index, row)
+            plans.append([(role, work, batch) for batch in batches])
+
+        # Round-robin across roles: best-first within each role, no role waiting for another to finish
+        jobs = [job for round_ in itertools.zip_longest(*plans) for job in round_ if job is not None]
+        for role, pairs in self._run_batches(jobs, max_workers):
+            for index, row in pairs:
+                yield from collect(role, index, row)
+
+    def _find_duplicates(self, resumes):
+        """Returns ``(unique, copies, signatures)``: positions analyzed, original -> duplicate positions, and
+        the MinHash signatures of the unique resumes."""
+        # Duplicates within the upload are analyzed once; their copies reuse the original's row
+        duplicates = DuplicateIndex()
+        unique, copies = [], {}
+        for index, (_, resume_text) in enumerate(resumes):
+            original = duplicates.add(index, resume_text)
+            if original is None:
+                unique.append(index)
+            else:
+                copies.setdefault(original, []).append(index)
+        if copies:
+            logging.info(f"Found {len(resumes) - len(unique)} duplicate resumes.")
+        return unique, copies, duplicates.signatures
+
+    def _with_copies(self, index, row, resumes, copies):
+        """Yields the row of a unique resume, then one row per duplicate of it naming the original."""
+        row.setdefault("duplicate_of", None)
+        yield index, row
+        for duplicate in copies.get(index, ()):
+            yield duplicate, dict(row, filename=resumes[duplicate][0], duplicate_of=resumes[index][0])
+
+    def _plan_unique(self, resumes, unique, signatures, hashes, job_description, batch_size, token_budget,
+                     threshold, shortlist_size):
+        """Scores the resumes at the ``unique`` positions locally for one job description.
+
+        Returns ``(rows, batches, work)``: ``(index, row)`` pairs decided
+        without an LLM call (stored, pre-screened out or not shortlisted), the
+        remaining positions grouped into batches best-first, and ``work(batch)``
+        which analyzes one batch into ``(index, row)`` pairs.
+        """
+        # Built once per JD: every resume below reuses its terms, weights and prompt text
+        profile = self.ats_backend.get_job_profile(job_description)
+
+        # Local pre-screen: rank by keyword overlap and reject clear misfits without an LLM call
+        scores = np.zeros(len(resumes))
+        scores[unique] = bm25_scores(profile.terms, profile.term_weights,
+                                     [resumes[index][1] for index in unique])
+        ranked = sorted(unique, key=lambda index: -scores[index])
+
+        # Resumes already analyzed against this JD in an earlier (possibly interrupted) run are reused,
+        # and so are the analyses of near-duplicates of them
+        jd_hash = self._result_key(profile)
+        reused = {}
+        if self.result_store is not None:
+            stored = self.result_store.get_many([hashes[index] for index in unique], jd_hash)
+            for index in unique:
+                if hashes[index] in stored:
+                    reused[index] = stored[hashes[index]]
+                elif index in signatures:
+                    row = self._stored_near_duplicate(signatures[index], jd_hash)
+                    if row is not None:
+                        reused[index] = dict(row, duplicate_of=row.get("filename"))
+        if reused:
+            logging.info(f"Reusing {len(reused)} stored analyses.")
+
+        rows = []
+        eligible = []
+        for index in ranked:
+            if index not in reused and scores[index] < threshold:
+                rows.append((index, self._prescreen_rejection_row(resumes[index][0], float(scores[index]))))
+            else:
+                eligible.append(index)
+
+        # Embedding shortlist: one batched similarity pass, then only the top resumes go to the LLM
+        semantic = {}
+        shortlisted = set(eligible)
+        if shortlist_size > 0 and len(eligible) > shortlist_size:
+            similarity = get_semantic_scorer().scores(profile.prompt_text,
+                                                      [resumes[index][1] for index in eligible])
+            order = np.argsort(-similarity, kind="stable")
+            semantic = {eligible[position]: float(similarity[position]) for position in order}
+            eligible = list(semantic)
+            shortlisted = set(eligible[:shortlist_size])
+            logging.info(f"Shortlisted {shortlist_size} of {len(eligible)} resumes by semantic similarity.")
+
+        candidates = []
+        for index in eligible:
+            extra = {"Pre-screen Score": float(scores[index])}
+            if semantic:
+                extra["Semantic Score"] = semantic[index]
+            if index in reused:
+                rows.append((index, dict(reused[index], filename=resumes[index][0], **extra)))
+            elif index not in shortlisted:
+                rows.append((index, dict(self._shortlist_rejection_row(resumes[index][0], semantic[index]),
+                                         **extra)))
+            else:
+                candidates.append(index)
+
+        if batch_size > 1 and candidates:
+            planned = self.plan_batches([resumes[index] for index in candidates], profile, batch_size,
+                                        token_budget or BULK_BATCH_TOKEN_BUDGET)
+            batches = [[candidates[position] for position in batch] for batch in planned]
+        else:
+            batches = [[index] for index in candidates]
+
+        def work(batch):
+            with llm_priority(BULK):  # Interactive requests are scheduled ahead of bulk calls
+                rows = self._process_resume_batch([resumes[index] for index in batch], profile)
+            for index, row in zip(batch, rows):
+                row["Pre-screen Score"] = float(scores[index])
+                if semantic:
+                    row["Semantic Score"] = semantic[index]
+                if self.result_store is not None and row["Suitability"] != "Error":
+                    try:
+                        self.result_store.put(hashes[index], jd_hash, row)  # Persist as soon as it completes
+                        if index in signatures:
+                            self.result_store.put_signature(hashes[index], signatures[index],
+                                                            band_keys(signatures[index]))
+                    except Exception as e:  # A failed write only costs a re-analysis later
+                        logging.warning(f"Could not store the analysis of {resumes[index][0]}: {e}")
+            return list(zip(batch, rows))
+
+        return rows, batches, work
+
+    def _run_batches(self, jobs, max_workers: int):
+        """Runs ``(key, work, batch)`` jobs with at most max_workers in flight, yielding ``(key, work(batch))``
+        as each finishes."""
+        if not jobs:
+            return
+        if max_workers <= 1:
+            for key, work, batch in jobs:
+                yield key, work(batch)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(jobs)))
+        try:
+            # Submitted in order, so the strongest candidates are scored first
+            futures = {executor.submit(work, batch): key for key, work, batch in jobs}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Stop queued batches if the consumer goes away early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _result_key(self, profile: JobProfile) -> str:
+        """Result store key for a JD: its hash plus the model and analysis version that produced the rows."""
+        return sha256_hex(f"{profile.jd_hash}:{self.ats_backend.llm.model_name}:{BULK_ANALYSIS_VERSION}")
+
+    def _stored_near_duplicate(self, signature: np.ndarray, jd_hash: str) -> Optional[dict]:
+        """Stored row for the JD of the most similar earlier resume at or above the dedup threshold, or None."""
+        similar = self.result_store.similar_signatures(band_keys(signature))
+        rows = self.result_store.get_many(similar, jd_hash)
+        best = best_match(signature, {key: similar[key] for key in rows}, DEDUP_NEAR_THRESHOLD)
+        return rows[best] if best is not None else None
+
+    def _prescreen_rejection_row(self, filename: str, score: float) -> dict:
+        """Result row for a resume rejected by the local pre-screen."""
+        return {
+            "filename": filename,
+            "Suitability": PRESCREEN_REJECTED,
+            "Match Percentage": "N/A",
+            "Key Strengths": [],
+            "Areas for Improvement": [f"Low keyword overlap with the job description (pre-screen score {score})"],
+            "Pre-screen Score": score,
+        }
+
+    def _shortlist_rejection_row(self, filename: str, similarity: float) -> dict:
+        """Result row for a resume left out of the embedding shortlist."""
+        return {
+            "filename": filename,
+            "Suitability": SHORTLIST_REJECTED,
+            "Match Percentage": "N/A",
+            "Key Strengths": [],
+            "Areas for Improvement": [f"Not among the resumes most similar to the job description "
+                                      f"(semantic score {similarity})"],
+        }
+
+    def plan_batches(self, resumes: List[Tuple[str, str]], job_profile: JobProfile, batch_size: int,
+                     token_budget: int) -> List[List[int]]:
+        """Greedily packs consecutive resumes into batches of at most batch_size that fit the token budget.
+
+        Returns batches of indexes into ``resumes``. The budget covers the job
+        description, the instructions, every resume in the batch, as compacted
+        for the prompt, and the ``BULK_BATCH_OUTPUT_TOKENS`` reserved for each
+        resume's answer; batch_size is capped so those reservations fit the
+        model's output limit. A resume that does not fit alone still gets its own batch.
+        """
+        batch_size = max(1, min(batch_size, GEMINI_OUTPUT_TOKEN_LIMIT // BULK_BATCH_OUTPUT_TOKENS))
+        fixed_tokens = job_profile.token_estimate + estimate_tokens(self.generate_batch_analysis_prompt([], ""))
+        batches = []
+        current = []
+        current_tokens = fixed_tokens
+        for index, (_, resume_text) in enumerate(resumes):
+            tokens = compact_resume(resume_text).tokens_after + BULK_BATCH_OUTPUT_TOKENS
+            if current and (len(current) >= batch_size or current_tokens + tokens > token_budget):
+                batches.append(current)
+                current = []
+                current_tokens = fixed_tokens
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def generate_batch_analysis_prompt(self, candidates: List[Tuple[str, str]], job_description: str) -> str:
+        """Generates one prompt that evaluates several resumes against a single copy of the job description."""
+        resumes = "\n\n".join(
+            f"### Candidate {index}\n{resume_text}" for index, (_, resume_text) in enumerate(candidates)
+        )
+        return f"""You are screening several candidates for the same role. Evaluate each candidate's resume independently against the job description, focusing on concrete skills and experience rather than subjective interpretations.
+
+Return ONLY a JSON array with exactly one object per candidate, in any order. Each object must have these keys:
+* candidate_id: the integer number from the candidate's "### Candidate N" heading.
+* suitability: either "Suitable" or "Not Suitable".
+* key_strengths: a list of 2-3 strings, each a strength and how it maps to the job description.
+* areas_for_improvement: a list of 1-2 strings.
+* match_percentage: the overall percentage match as a number between 0 and 100.
+
+Here's the job description:
+{job_description}
+
+And here are the candidates' resumes:
+{resumes}
+"""
+
+    def parse_batch_analysis_response(self, response_text: str, count: int) -> dict:
+        """Parses a batched JSON response into {candidate index: analysis}, skipping malformed entries."""
+        # Complete entries of a cut-off batch still count; cut entries fall back to single calls
+        entries = extract_json(response_text, "[", allow_truncated=True)
+        if not isinstance(entries, list):
+            raise SchemaError("Batched response is not a JSON array.")
+
+        analyses = {}
+        for entry in entries:
             try:
-                # Get the analysis using the ATSBackend's analyze_resume method, passing is_bulk=True
-                analysis = self.ats_backend.analyze_resume(resume_text, job_description, is_bulk=True)
-
-                # --- New logic: determine suitability based on match percentage ---
-                match_str = analysis.get("Match Percentage", "0")
-                try:
-                    match_score = float(match_str.replace("%", "").strip())
-                except Exception:
-                    match_score = 0
-
-                suitability = "Suitable" if match_score > 70 else "Not Suitable"
-                analysis["Suitability"] = suitability
-                
-                results.append({
-                    "filename": filename,
-                    "Suitability": analysis.get("Suitability", "N/A"),
-                    "Match Percentage": analysis.get("Match Percentage", "N/A"),
-                    "Key Strengths": analysis.get("Key Strengths", ""),  # Use the string directly
-                    "Areas for Improvement": analysis.get("Areas for Improvement", "")  # Use the string directly
-                })
+                index = int(entry["candidate_id"])
+                if not 0 <= index < count or index in analyses:
+                    raise SchemaError(f"Unexpected candidate_id {index}")
+                analyses[index] = BulkAnalysis.from_dict(entry).to_display()
+                parse_metrics.record("BatchedBulkAnalysis", "parsed")
+            except (KeyError, TypeError, ValueError) as e:  # SchemaError is a ValueError
+                parse_metrics.record("BatchedBulkAnalysis", "failed")
+                logging.warning(f"Skipping malformed entry in batched response: {e}")
+        return analyses
+
+    def _process_resume_batch(self, batch: List[Tuple[str, str]], job_profile: JobProfile) -> List[dict]:
+        """Analyzes a batch of resumes in one LLM call, falling back to single calls for unparsed candidates."""
+        if len(batch) == 1:
+            return [self._process_single_resume(batch[0][0], batch[0][1], job_profile)]
+
+        analyses = {}
+        try:
+            sanitize = self.ats_backend.sanitize_input
+            prompt = self.generate_batch_analysis_prompt(
+                [(filename, sanitize(compact_resume(resume_text).text)) for filename, resume_text in batch],
+                job_profile.prompt_text)
+            response_text = self.ats_backend.llm.generate(
+                prompt, generation_config={"max_output_tokens": min(BULK_BATCH_OUTPUT_TOKENS * len(batch),
+                                                                    GEMINI_OUTPUT_TOKEN_LIMIT)},
+                json_mode=True, validate=lambda text: extract_json(text, "["))
+            analyses = self.parse_batch_analysis_response(response_text, len(batch))
+        except Exception as e:
+            logging.error(f"Batched analysis of {len(batch)} resumes failed, falling back to single calls: {e}")
 
-            except Exception as e:
-                logging.exception(f"Error analyzing resume {filename}: {e}")
-                results.append({
-                    "filename": filename,
-                    "Suitability": "Error",
-                    "Match Percentage": "N/A",
-                    "Key Strengths": "",
-                    "Areas for Improvement": f"Error during processing: {e}"
-                })
+        results = []
+        for index, (filename, resume_text) in enumerate(batch):
+            if index in analyses:
+                results.append(self._build_result_row(filename, analyses[index]))
+            else:
+                results.append(self._process_single_resume(filename, resume_text, job_profile))
+        return results
 
-        return results  # Return the list of dictionaries
+    def _process_single_resume(self, filename: str, resume_text: str, job_profile: JobProfile) -> dict:
+        """Analyzes one resume for bulk mode, turning any failure into an error row."""
+        try:
+            # Get the analysis using the ATSBackend's analyze_resume method, passing is_bulk=True
+            analysis = self.ats_backend.analyze_resume(resume_text, job_profile, is_bulk=True)
+            return self._build_result_row(filename, analysis)
+
+        except Exception as e:
+            logging.exception(f"Error analyzing resume {filename}: {e}")
+            return {
+                "filename": filename,
+                "Suitability": "Error",
+                "Match Percentage": "N/A",
+                "Key Strengths": "",
+                "Areas for Improvement": f"Error during processing: {e}"
+            }
+
+    def _build_result_row(self, filename: str, analysis: dict) -> dict:
+        """Turns a bulk analysis into a result row, deriving suitability from the match percentage."""
+        # --- New logic: determine suitability based on match percentage ---
+        match_str = analysis.get("Match Percentage", "0")
+        try:
+            match_score = float(match_str.replace("%", "").strip())
+        except Exception:
+            match_score = 0
+
+        suitability = "Suitable" if match_score > 70 else "Not Suitable"
+        analysis["Suitability"] = suitability
+
+        return {
+            "filename": filename,
+            "Suitability": analysis.get("Suitability", "N/A"),
+            "Match Percentage": analysis.get("Match Percentage", "N/A"),
+            "Key Strengths": analysis.get("Key Strengths", ""),  # Use the string directly
+            "Areas for Improvement": analysis.get("Areas for Improvement", "")  # Use the string directly
+        }
 
     def sanitize_input(self, text: str) -> str:
         """Sanitize input text to remove problematic characters."""
@@ -714,20 +1414,8 @@ class BulkATSBackend:
         return text.replace("&", "&").replace("<", "<").replace(">", ">")
 
     def _get_llm_response(self, prompt: str) -> str:
-        """Helper function to get the LLM response. Abstract this out so you can swap implementations."""
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment.")
-
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("gemini-1.5-pro-latest")  # Or the model you prefer
-
-        try:
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            logging.error(f"LLM generation failed: {e}")  # Log LLM failures specifically
-            raise  # Re-raise so analyze_resume handles it
+        """Helper function to get the LLM response through the shared LLM client."""
+        return self.ats_backend.llm.generate(prompt)
 
     def clear_resumes(self):
         """Clear stored resumes data."""
@@ -0,0 +1,8 @@
+"""Offline benchmarks for the SmartScreen backend.
+
+Run from the backend directory so the flat backend modules are importable::
+
+    python -m benchmarks.run --resumes 100 --latency lognormal:0.05,0.5
+
+No Gemini quota is used: every LLM call is answered by ``fake_llm.FakeGenerativeModel``.
+"""
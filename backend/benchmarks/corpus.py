@@ -0,0 +1,126 @@
+import argparse
+import io
+import random
+import zipfile
+from typing import List, Tuple
+
+SKILLS = [
+    "Python", "Java", "JavaScript", "TypeScript", "Go", "SQL", "PostgreSQL", "MongoDB", "Redis", "Kafka",
+    "Docker", "Kubernetes", "AWS", "GCP", "Azure", "Terraform", "React", "Node.js", "Flask", "Django",
+    "Spark", "Airflow", "TensorFlow", "PyTorch", "Pandas", "NumPy", "Git", "CI/CD", "Linux", "REST APIs",
+]
+TITLES = ["Software Engineer", "Data Engineer", "Backend Developer", "ML Engineer", "DevOps Engineer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Hooli", "Stark Industries", "Wayne Tech"]
+VERBS = ["Built", "Designed", "Led", "Optimized", "Migrated", "Automated", "Maintained", "Shipped"]
+OBJECTS = ["a payment service", "the data platform", "an internal dashboard", "CI pipelines",
+           "a recommendation model", "the search API", "batch ETL jobs", "a customer portal"]
+LINES_PER_PAGE = 45
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Builds a minimal text-only PDF with one Helvetica text block per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        content = "BT /F1 11 Tf 72 750 Td 14 TL " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def make_resume_lines(rng: random.Random, index: int, pages: int) -> List[str]:
+    """Generates resume text with the usual sections, sized to roughly the given page count."""
+    skills = rng.sample(SKILLS, rng.randint(6, 14))
+    lines = [
+        f"Candidate {index:05d}",
+        f"{rng.choice(TITLES)} | candidate{index}@example.com | +1 555 {rng.randint(1000, 9999)}",
+        "",
+        "SUMMARY",
+        f"{rng.choice(TITLES)} with {rng.randint(1, 15)} years of experience in {', '.join(skills[:3])}.",
+        "",
+        "SKILLS",
+        ", ".join(skills),
+        "",
+        "EXPERIENCE",
+    ]
+    while len(lines) < pages * LINES_PER_PAGE - 4:
+        lines.append(f"{rng.choice(TITLES)} - {rng.choice(COMPANIES)} ({rng.randint(2010, 2023)})")
+        for _ in range(rng.randint(2, 4)):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)}")
+    lines += ["", "EDUCATION", f"B.Tech in Computer Science, {rng.choice(COMPANIES)} University"]
+    return lines
+
+
+def make_job_description(seed: int = 0) -> str:
+    rng = random.Random(seed)
+    skills = rng.sample(SKILLS, 8)
+    return (f"We are hiring a {rng.choice(TITLES)}. Required: {', '.join(skills[:5])}. "
+            f"Nice to have: {', '.join(skills[5:])}. You will build and operate backend services, "
+            f"collaborate with product teams and own features end to end.")
+
+
+def make_corpus(count: int, seed: int = 0, min_pages: int = 1, max_pages: int = 2,
+                corrupt_rate: float = 0.0) -> List[Tuple[str, bytes]]:
+    """Returns [(filename, pdf bytes)] for count synthetic resumes.
+
+    ``corrupt_rate`` of the files are truncated PDFs, to exercise extraction
+    error handling.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(count):
+        lines = make_resume_lines(rng, index, rng.randint(min_pages, max_pages))
+        pages = [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)]
+        data = make_pdf(pages)
+        if rng.random() < corrupt_rate:
+            data = data[:len(data) // 3]
+        corpus.append((f"resumes/resume_{index:05d}.pdf", data))
+    return corpus
+
+
+def make_zip(corpus: List[Tuple[str, bytes]]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in corpus:
+            archive.writestr(filename, data)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic resume ZIP and job description for benchmarking.")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=2)
+    parser.add_argument("--corrupt-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="synthetic_resumes.zip")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.count, args.seed, args.min_pages, args.max_pages, args.corrupt_rate)
+    with open(args.output, "wb") as f:
+        f.write(make_zip(corpus))
+    with open(args.output.rsplit(".", 1)[0] + "_job_description.txt", "w") as f:
+        f.write(make_job_description(args.seed))
+    print(f"Wrote {len(corpus)} resumes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
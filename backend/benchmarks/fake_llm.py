@@ -0,0 +1,170 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+
+# Placeholder markdown returned for free-text prompts (formatting, keyword optimization, reviews)
+CANNED_TEXT = """**Overall Assessment:** The resume covers most of the core requirements.
+
+* Strength: relevant project experience with the requested stack.
+* Improvement: quantify achievements and mirror the job description's keywords.
+* Formatting: use standard section headers and a single-column layout.
+"""
+
+STRENGTHS = [
+    "Python: several years building production services",
+    "Cloud: deployed and operated workloads on AWS",
+    "Data: designed SQL schemas and ETL pipelines",
+    "Leadership: mentored junior engineers",
+]
+IMPROVEMENTS = [
+    "Limited evidence of Kubernetes experience",
+    "No quantified impact in recent roles",
+    "Missing the requested certification",
+]
+CANDIDATE_PATTERN = re.compile(r"^### Candidate (\d+)$", re.MULTILINE)
+
+
+class LatencyModel:
+    """Samples simulated LLM latencies in seconds.
+
+    Specs are ``none``, ``constant:S``, ``uniform:LOW,HIGH`` or
+    ``lognormal:MEDIAN,SIGMA``.
+    """
+
+    KINDS = ("none", "constant", "uniform", "lognormal")
+
+    def __init__(self, spec: str = "none"):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}', expected one of {', '.join(self.KINDS)}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(self.params[0], self.params[1])
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.params[0]), self.params[1])
+        return 0.0
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Deterministic stand-in for ``genai.GenerativeModel`` that never touches the network.
+
+    The reply is chosen from the prompt: each backend prompt gets a canned,
+    schema-valid JSON answer (or markdown for free-text prompts). With
+    ``malformed_rate`` > 0 that fraction of first-pass JSON answers is broken
+    in one of the ways real models break them, so the repair and fallback
+    paths are exercised too; repair prompts are always answered correctly.
+    Latency and content are seeded from the prompt, so a given prompt gets the
+    same answer and delay regardless of thread scheduling.
+    """
+
+    MALFORMED_KINDS = ("fenced_prose", "truncated", "bad_percentage", "missing_key")
+
+    def __init__(self, model_name: str = "models/fake", latency: str = "none", malformed_rate: float = 0.0,
+                 seed: int = 0):
+        self.model_name = model_name
+        self.latency = LatencyModel(latency)
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.malformed = 0
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        rng = random.Random(f"{self.seed}:{prompt}")
+        time.sleep(self.latency.sample(rng))
+        text, is_json = self._canned_response(prompt, rng)
+        broken = is_json and "failed validation" not in prompt and rng.random() < self.malformed_rate
+        if broken:
+            text = self._break(text, rng)
+        with self._lock:
+            self.calls += 1
+            self.malformed += broken
+        return FakeResponse(text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "malformed": self.malformed}
+
+    def _canned_response(self, prompt: str, rng: random.Random):
+        """Returns (text, is_json) shaped for whichever backend prompt this is."""
+        if "failed validation" in prompt:  # Repair prompts name the schema's keys
+            if '"line_content"' in prompt:
+                return json.dumps(self._suggestions(rng)), True
+            if '"keyword_analysis"' in prompt:
+                return json.dumps(self._combined(rng)), True
+            if '"resume_formatting_tips"' in prompt:
+                return json.dumps(self._individual(rng)), True
+            return json.dumps(self._bulk(rng)), True
+        candidates = CANDIDATE_PATTERN.findall(prompt)
+        if candidates:
+            return json.dumps([dict(self._bulk(rng), candidate_id=int(index)) for index in candidates]), True
+        if "keyword_analysis:" in prompt:
+            return json.dumps(self._combined(rng)), True
+        if "line_content" in prompt:
+            return json.dumps(self._suggestions(rng)), True
+        if "resume_formatting_tips:" in prompt:
+            return json.dumps(self._individual(rng)), True
+        if "suitability: either" in prompt:
+            return json.dumps(self._bulk(rng)), True
+        return CANNED_TEXT, False
+
+    def _break(self, text: str, rng: random.Random) -> str:
+        kind = rng.choice(self.MALFORMED_KINDS)
+        if kind == "fenced_prose":  # Recoverable without a repair call
+            return f"Here is the analysis you asked for:\n```json\n{text}\n```\nLet me know if you need more."
+        if kind == "truncated":
+            return text[:max(1, len(text) // 2)]
+        if kind == "bad_percentage":
+            return re.sub(r'"match_percentage": (\d+)', r'"match_percentage": "about \1 percent"', text, count=1)
+        return re.sub(r'"key_strengths": \[[^\]]*\], ', "", text, count=1)
+
+    def _bulk(self, rng: random.Random) -> dict:
+        match = rng.randint(20, 95)
+        return {
+            "suitability": "Suitable" if match > 70 else "Not Suitable",
+            "key_strengths": rng.sample(STRENGTHS, 2),
+            "areas_for_improvement": rng.sample(IMPROVEMENTS, 1),
+            "match_percentage": match,
+        }
+
+    def _individual(self, rng: random.Random) -> dict:
+        return {
+            "match_percentage": rng.randint(20, 95),
+            "found_keywords": ["python", "sql", "aws"],
+            "missing_keywords": ["kubernetes"],
+            "key_strengths": rng.sample(STRENGTHS, 2),
+            "areas_for_improvement": rng.sample(IMPROVEMENTS, 2),
+            "resume_formatting_tips": ["Use standard section headings"],
+        }
+
+    def _combined(self, rng: random.Random) -> dict:
+        match = rng.randint(20, 95)
+        return {
+            "match_percentage": match,
+            "suitability": "Suitable" if match > 70 else "Not Suitable",
+            "reason": "The candidate covers most required skills.",
+            "keyword_analysis": CANNED_TEXT,
+            "formatting_review": CANNED_TEXT,
+            "resume_review": CANNED_TEXT,
+        }
+
+    def _suggestions(self, rng: random.Random) -> list:
+        return [
+            {"section": "Experience", "line_content": "Worked on backend services",
+             "suggestion": "Built Python services handling 1M requests/day", "reason": "Quantifies impact"}
+            for _ in range(rng.randint(1, 3))
+        ]
@@ -0,0 +1,334 @@
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then reported as null
+    resource = None
+
+BENCHMARKS = ("extraction", "engines", "single", "bulk", "flask")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _configure_environment():
+    """Keeps benchmark runs hermetic: no persisted results, no text cache, no payload logging, no rate limits."""
+    os.environ["RESULT_STORE_DB"] = ""
+    os.environ["TEXT_CACHE_SIZE"] = "0"
+    os.environ["TEXT_CACHE_DB"] = ""
+    os.environ["JOB_STORE_DB"] = ""
+    os.environ["EMBEDDING_INDEX_DIR"] = ""
+    os.environ["LOG_PAYLOADS"] = "false"
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    # The fake model has no quota, so rate limits are off unless set explicitly
+    os.environ.setdefault("GEMINI_RPM", "0")
+    os.environ.setdefault("GEMINI_TPM", "0")
+
+
+def _install_fake_model(options):
+    """Points the shared LLM client at a fresh fake model with the response cache disabled."""
+    from benchmarks.fake_llm import FakeGenerativeModel
+    from cache import ResponseCache
+    from llm_client import get_llm_client
+
+    client = get_llm_client()
+    client.response_cache = ResponseCache(max_entries=0)
+    fake = FakeGenerativeModel(latency=options["latency"], malformed_rate=options["malformed_rate"],
+                               seed=options["seed"])
+    client.use_model(fake)
+    return fake
+
+
+def latency_summary(latencies) -> dict:
+    """p50/p95/p99, mean and max of a list of durations in seconds."""
+    if not latencies:
+        return {}
+    values = np.asarray(latencies, dtype=float)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 6), "p95": round(float(p95), 6), "p99": round(float(p99), 6),
+            "mean": round(float(values.mean()), 6), "max": round(float(values.max()), 6)}
+
+
+def _peak_rss_mb(who) -> float:
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def bench_extraction(options, corpus, job_description):
+    """Per-file PDF parsing latency, then pooled ZIP extraction throughput."""
+    from backend import BulkATSBackend, ATSBackend, extract_text_from_pdf_bytes
+    from benchmarks.corpus import make_zip
+
+    latencies, errors = [], 0
+    for _, data in corpus:
+        start = time.perf_counter()
+        try:
+            extract_text_from_pdf_bytes(data)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    bulk = BulkATSBackend(ATSBackend(), result_store=None)
+    archive = make_zip(corpus)
+    start = time.perf_counter()
+    bulk.extract_text_from_zip(io.BytesIO(archive), max_workers=options["extract_workers"])
+    wall = time.perf_counter() - start
+    return {"items": len(corpus), "wall_seconds": wall, "latencies": latencies, "errors": errors,
+            "serial_seconds": sum(latencies)}
+
+
+def bench_engines(options, corpus, job_description):
+    """Pages/sec of each PDF engine, and of "auto" (fast engine with fallback), over the same files."""
+    from pdf_extraction import ENGINES, extract_pdf
+
+    engines = {}
+    latencies, errors = [], 0
+    for engine in (*ENGINES, "auto"):
+        pages, seconds, failed, fallbacks = 0, 0.0, 0, {}
+        for _, data in corpus:
+            call_start = time.perf_counter()
+            try:
+                result = extract_pdf(data, engine)
+            except Exception:
+                failed += 1
+            else:
+                pages += result.pages
+                if result.fallback_reason:
+                    fallbacks[result.fallback_reason] = fallbacks.get(result.fallback_reason, 0) + 1
+            elapsed = time.perf_counter() - call_start
+            seconds += elapsed
+            if engine == "auto":
+                latencies.append(elapsed)
+        errors += failed if engine == "auto" else 0
+        engines[engine] = {"pages": pages, "seconds": round(seconds, 6), "errors": failed,
+                           "pages_per_sec": round(pages / seconds, 3) if seconds else None, "fallbacks": fallbacks}
+    # Throughput and latency of the run are those of "auto", the production path
+    return {"items": len(corpus), "wall_seconds": engines["auto"]["seconds"], "latencies": latencies,
+            "errors": errors, "engines": engines}
+
+
+def bench_single(options, corpus, job_description):
+    """One individual analysis per resume, sequentially."""
+    from backend import ATSBackend, extract_text_from_pdf_bytes
+
+    texts = []
+    for _, data in corpus:
+        try:
+            texts.append(extract_text_from_pdf_bytes(data))
+        except Exception:
+            pass
+    backend = ATSBackend()
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for text in texts:
+        call_start = time.perf_counter()
+        try:
+            backend.analyze_resume(text, job_description)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - call_start)
+    return {"items": len(texts), "wall_seconds": time.perf_counter() - start, "latencies": latencies,
+            "errors": errors}
+
+
+def bench_bulk(options, corpus, job_description):
+    """ZIP extraction plus bulk analysis; latency is each resume's time-to-result from the start of the run."""
+    from backend import ATSBackend, BulkATSBackend
+    from benchmarks.corpus import make_zip
+
+    archive = make_zip(corpus)
+    bulk = BulkATSBackend(ATSBackend(), result_store=None)
+    start = time.perf_counter()
+    bulk.extract_text_from_zip(io.BytesIO(archive), max_workers=options["extract_workers"])
+    latencies, errors = [], 0
+    for _, row in bulk.iter_bulk_results(job_description, max_workers=options["bulk_workers"],
+                                         batch_size=options["batch_size"]):
+        latencies.append(time.perf_counter() - start)
+        errors += row["Suitability"] == "Error"
+    return {"items": len(bulk.resumes_data), "wall_seconds": time.perf_counter() - start,
+            "latencies": latencies, "errors": errors}
+
+
+def bench_flask(options, corpus, job_description):
+    """Concurrent POST /api/analyze requests, then one streamed bulk request, through Flask's test client."""
+    import app as flask_app
+    from benchmarks.corpus import make_zip
+
+    def post_analyze(item):
+        filename, data = item
+        client = flask_app.app.test_client()
+        call_start = time.perf_counter()
+        response = client.post("/api/analyze", data={
+            "resume": (io.BytesIO(data), os.path.basename(filename)), "job_description": job_description})
+        return time.perf_counter() - call_start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options["flask_concurrency"]) as executor:
+        outcomes = list(executor.map(post_analyze, corpus))
+    analyze_wall = time.perf_counter() - start
+
+    client = flask_app.app.test_client()
+    stream_start = time.perf_counter()
+    response = client.post("/api/bulk-analyze/stream", data={
+        "resumes": (io.BytesIO(make_zip(corpus)), "resumes.zip"), "job_description": job_description})
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+    stream_wall = time.perf_counter() - stream_start
+
+    return {
+        "items": len(corpus),
+        "wall_seconds": analyze_wall,
+        "latencies": [latency for latency, _ in outcomes],
+        "errors": sum(status != 200 for _, status in outcomes),
+        "bulk_stream": {
+            "status": response.status_code,
+            "records": sum(record["type"] == "result" for record in records),
+            "wall_seconds": round(stream_wall, 6),
+            "resumes_per_sec": round(len(corpus) / stream_wall, 3) if stream_wall else None,
+        },
+    }
+
+
+def run_benchmark(name: str, options: dict) -> dict:
+    """Runs one benchmark in the current process and summarizes it."""
+    _configure_environment()
+    logging.disable(logging.CRITICAL if not options["verbose"] else logging.NOTSET)
+    from benchmarks.corpus import make_corpus, make_job_description
+
+    corpus = make_corpus(options["resumes"], options["seed"], options["min_pages"], options["max_pages"],
+                         options["corrupt_rate"])
+    job_description = make_job_description(options["seed"])
+    fake = _install_fake_model(options)
+
+    bench = globals()[f"bench_{name}"]
+    for _ in range(options["warmup"]):
+        bench(options, corpus[:max(1, len(corpus) // 10)], job_description)
+
+    runs = [bench(options, corpus, job_description) for _ in range(options["iterations"])]
+    latencies = [latency for run in runs for latency in run.pop("latencies")]
+    wall = sum(run["wall_seconds"] for run in runs)
+    items = sum(run["items"] for run in runs)
+    return {
+        "items": items,
+        "errors": sum(run["errors"] for run in runs),
+        "wall_seconds": round(wall, 6),
+        "resumes_per_sec": round(items / wall, 3) if wall else None,
+        "latency_seconds": latency_summary(latencies),
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        "llm": fake.stats(),
+        "runs": [{key: round(value, 6) if isinstance(value, float) else value for key, value in run.items()}
+                 for run in runs],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Relative change in throughput and p95 latency per benchmark present in both runs."""
+    changes = {}
+    for name, result in current["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous or "error" in result or "error" in previous:
+            continue
+        change = {}
+        if result.get("resumes_per_sec") and previous.get("resumes_per_sec"):
+            change["resumes_per_sec_pct"] = round(100 * (result["resumes_per_sec"] / previous["resumes_per_sec"] - 1), 2)
+        p95, previous_p95 = result["latency_seconds"].get("p95"), previous["latency_seconds"].get("p95")
+        if p95 and previous_p95:
+            change["p95_latency_pct"] = round(100 * (p95 / previous_p95 - 1), 2)
+        changes[name] = change
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline SmartScreen benchmarks against a fake LLM.")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS),
+                        help=f"Comma-separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--resumes", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1, help="Warm-up runs on a tenth of the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=2)
+    parser.add_argument("--corrupt-rate", type=float, default=0.0)
+    parser.add_argument("--latency", default="lognormal:0.05,0.5",
+                        help="Fake LLM latency: none, constant:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of first-pass JSON replies that are malformed")
+    parser.add_argument("--extract-workers", type=int, default=None)
+    parser.add_argument("--bulk-workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--flask-concurrency", type=int, default=4)
+    parser.add_argument("--output", default=None, help="Result JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="Earlier result JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep backend logging enabled")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.benchmarks.split(",") if name.strip()]
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    options = {key: value for key, value in vars(args).items() if key not in ("benchmarks", "output", "baseline")}
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "benchmarks": {},
+    }
+    for name in names:
+        # A fresh interpreter per benchmark keeps peak RSS and warm caches from leaking between them
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            try:
+                report["benchmarks"][name] = executor.submit(run_benchmark, name, options).result()
+            except Exception as e:
+                report["benchmarks"][name] = {"error": str(e)}
+        result = report["benchmarks"][name]
+        if "error" in result:
+            print(f"{name:<11} failed: {result['error']}")
+        else:
+            latency = result["latency_seconds"]
+            print(f"{name:<11} {result['resumes_per_sec']:>9} resumes/s  p50 {latency.get('p50')}s  "
+                  f"p95 {latency.get('p95')}s  p99 {latency.get('p99')}s  peak RSS {result['peak_rss_mb']} MB")
+            for engine, stats in result["runs"][-1].get("engines", {}).items():
+                print(f"  {engine:<10} {stats['pages_per_sec']:>9} pages/s  fallbacks {stats['fallbacks']}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+        for name, change in report["comparison"].items():
+            print(f"{name:<11} vs baseline: {change}")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
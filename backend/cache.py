@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def sha256_hex(data) -> str:
+    """Returns the SHA-256 hex digest of bytes or text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with hit/miss counters and an optional TTL in seconds."""
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._expires = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached value or None, marking the entry as recently used."""
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            if self.ttl is not None and self._expires[key] < time.monotonic():
+                del self._data[key]
+                del self._expires[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key, value):
+        """Stores a value, evicting the least recently used entries beyond max_entries."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.max_entries:
+                evicted, _ = self._data.popitem(last=False)
+                self._expires.pop(evicted, None)
+
+    def clear(self):
+        """Drops every entry and resets the counters."""
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns size and hit/miss counters."""
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+
+def response_cache_key(prompt: str, model_name: str, generation_config: Optional[dict] = None) -> str:
+    """Builds an LLM response cache key from the whitespace-normalized prompt, model and config."""
+    normalized_prompt = " ".join(prompt.split())
+    config = json.dumps(generation_config or {}, sort_keys=True, default=str)
+    return sha256_hex("\x1f".join([model_name, config, normalized_prompt]))
+
+
+class ResponseCache(LRUCache):
+    """LLM response cache. Any object with the same get/set/stats methods can replace it."""
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = 3600):
+        super().__init__(max_entries, ttl)
+
+
+class SQLiteTextCache:
+    """On-disk text cache stored in a SQLite file, evicting least recently used rows by total size."""
+
+    def __init__(self, db_path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Reconnect after a fork so worker processes never share a handle
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS text_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS text_cache_accessed ON text_cache (accessed)")
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached text or None."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value FROM text_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE text_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str):
+        """Stores text and evicts the least recently used rows while over max_bytes."""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO text_cache (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM text_cache").fetchone()[0]
+            if total > self.max_bytes:
+                evict = []
+                for row_key, row_size in conn.execute("SELECT key, size FROM text_cache ORDER BY accessed"):
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((row_key,))
+                    total -= row_size
+                conn.executemany("DELETE FROM text_cache WHERE key = ?", evict)
+            conn.commit()
+
+
+class TextCache:
+    """Two-tier cache for extracted resume text keyed by the SHA-256 of the PDF bytes."""
+
+    def __init__(self, max_entries: int = 256, db_path: Optional[str] = None,
+                 max_db_bytes: int = 256 * 1024 * 1024):
+        self.memory = LRUCache(max_entries)
+        self.disk = SQLiteTextCache(db_path, max_db_bytes) if db_path else None
+
+    def get(self, key: str) -> Optional[str]:
+        """Looks the key up in memory first, then on disk (promoting disk hits)."""
+        text = self.memory.get(key)
+        if text is None and self.disk is not None:
+            try:
+                text = self.disk.get(key)
+            except sqlite3.Error as e:
+                logging.error(f"Text cache read failed: {e}")
+                text = None
+            if text is not None:
+                self.memory.set(key, text)
+        return text
+
+    def set(self, key: str, text: str):
+        """Stores text in both tiers."""
+        self.memory.set(key, text)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, text)
+            except sqlite3.Error as e:
+                logging.error(f"Text cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Returns the in-memory tier counters."""
+        return self.memory.stats()
@@ -0,0 +1,177 @@
+import logging
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from llm_client import estimate_tokens
+from metrics import metrics
+
+# Input token budgets for prompts; 0 keeps every line (normalization and deduplication still apply)
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "4000"))
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "2000"))
+
+HEADER = "header"  # Text before the first recognised heading (name, contact details)
+
+RESUME_SECTIONS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "internships", "internship"),
+    "skills": ("skills", "technical skills", "key skills", "core competencies", "competencies",
+               "skills and tools", "tools and technologies", "technologies"),
+    "education": ("education", "academic background", "academics", "educational qualifications",
+                  "qualifications"),
+    "projects": ("projects", "personal projects", "academic projects", "key projects"),
+    "certifications": ("certifications", "certificates", "licenses and certifications", "courses"),
+    "achievements": ("achievements", "awards", "honors", "honours", "awards and achievements",
+                     "accomplishments"),
+    "publications": ("publications", "research"),
+    "volunteering": ("volunteering", "volunteer experience", "extracurricular activities",
+                     "extra curricular activities", "activities", "leadership"),
+    "languages": ("languages",),
+    "interests": ("interests", "hobbies", "hobbies and interests"),
+    "references": ("references",),
+}
+# Trimmed first to last when over budget; sections not listed are trimmed right before the header
+RESUME_TRIM_ORDER = ("references", "interests", "languages", "volunteering", "publications", "achievements",
+                     "certifications", "summary", "projects", "education", HEADER, "skills", "experience")
+
+JD_SECTIONS = {
+    "about": ("about us", "about the company", "who we are", "our company", "company overview", "about"),
+    "benefits": ("benefits", "perks", "what we offer", "perks and benefits", "compensation and benefits"),
+    "equal_opportunity": ("equal opportunity", "equal employment opportunity", "eeo statement", "diversity"),
+    "responsibilities": ("responsibilities", "key responsibilities", "what you will do", "what you'll do",
+                         "the role", "role", "duties"),
+    "requirements": ("requirements", "qualifications", "minimum qualifications", "required qualifications",
+                     "what you bring", "what we're looking for", "must have", "skills"),
+    "preferred": ("preferred qualifications", "nice to have", "bonus points", "preferred"),
+}
+JD_TRIM_ORDER = ("equal_opportunity", "benefits", "about", HEADER, "preferred", "responsibilities",
+                 "requirements")
+
+PAGE_FURNITURE = re.compile(
+    r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|\d+\s*(?:of|/)\s*\d+|[-–—\s]*\d{1,3}[-–—\s]*"
+    r"|curriculum vitae|resume|résumé)$",
+    re.IGNORECASE,
+)
+WHITESPACE = re.compile(r"\s+")
+HEADING_PUNCTUATION = re.compile(r"[:\-–—|#*_=•]+")
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    sections: List[str] = field(default_factory=list)
+    trimmed_sections: List[str] = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def normalize_lines(text: str) -> List[str]:
+    """Normalizes unicode and whitespace, drops page numbers and exact duplicate lines.
+
+    Repeated page headers/footers (e.g. the candidate's name on every page)
+    are duplicates of their first occurrence and disappear with them.
+    """
+    lines = []
+    seen = set()
+    for raw_line in unicodedata.normalize("NFKC", text or "").splitlines():
+        line = WHITESPACE.sub(" ", raw_line).strip()
+        if not line or PAGE_FURNITURE.match(line):
+            continue
+        key = line.casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return lines
+
+
+def heading_lookup(section_aliases: Dict[str, Tuple[str, ...]]) -> Dict[str, str]:
+    """Maps every heading alias to its section name."""
+    return {alias: section for section, aliases in section_aliases.items() for alias in aliases}
+
+
+def match_heading(line: str, lookup: Dict[str, str]) -> Optional[str]:
+    """Returns the section a short line is the heading of, or None."""
+    if len(line.split()) > 5:
+        return None
+    candidate = HEADING_PUNCTUATION.sub(" ", line).replace("&", "and").casefold()
+    return lookup.get(" ".join(candidate.split()))
+
+
+def detect_sections(lines: List[str], section_aliases: Dict[str, Tuple[str, ...]]) -> List[Tuple[str, List[str]]]:
+    """Splits lines into [(section, lines)] at recognised headings; each heading stays with its section."""
+    lookup = heading_lookup(section_aliases)
+    sections = [(HEADER, [])]
+    for line in lines:
+        section = match_heading(line, lookup)
+        if section is not None:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, body) for name, body in sections if body]
+
+
+def _join(sections: List[Tuple[str, List[str]]]) -> str:
+    return "\n".join(line for _, body in sections for line in body)
+
+
+def compact_text(text: str, token_budget: int, section_aliases: Dict[str, Tuple[str, ...]],
+                 trim_order: Tuple[str, ...]) -> CompactionResult:
+    """Normalizes text and trims whole low-value sections, then lines from their end, until it fits the budget."""
+    tokens_before = estimate_tokens(text or "")
+    sections = detect_sections(normalize_lines(text), section_aliases)
+    names = [name for name, _ in sections]
+    trimmed = []
+
+    if token_budget > 0 and estimate_tokens(_join(sections)) > token_budget:
+        rank = {name: position for position, name in enumerate(trim_order)}
+        header_rank = rank.get(HEADER, len(trim_order))
+        order = sorted(range(len(sections)), key=lambda index: rank.get(sections[index][0], header_rank - 0.5))
+        # Work on line token estimates so trimming stays linear in the number of lines
+        total = sum(estimate_tokens(line) for _, body in sections for line in body)
+        for index in order:
+            name, body = sections[index]
+            while body and total > token_budget:
+                total -= estimate_tokens(body.pop())
+                if name not in trimmed:
+                    trimmed.append(name)
+            if total <= token_budget:
+                break
+        sections = [(name, body) for name, body in sections if body]
+
+    compacted = _join(sections)
+    return CompactionResult(compacted, tokens_before, estimate_tokens(compacted), names, trimmed)
+
+
+def _record(kind: str, result: CompactionResult):
+    for stage, tokens in (("before", result.tokens_before), ("after", result.tokens_after)):
+        metrics.inc("smartscreen_compaction_tokens_total", tokens,
+                    help="Estimated input tokens before and after compaction, per distinct text.", kind=kind, stage=stage)
+    trimmed = f", trimmed {', '.join(result.trimmed_sections)}" if result.trimmed_sections else ""
+    logging.info(f"Compacted {kind}: {result.tokens_before} -> {result.tokens_after} tokens "
+                 f"(sections: {', '.join(result.sections)}{trimmed})")
+
+
+@lru_cache(maxsize=256)
+def compact_resume(text: str, token_budget: int = RESUME_TOKEN_BUDGET) -> CompactionResult:
+    """Compacts resume text for prompting; results are memoized per text and budget."""
+    result = compact_text(text, token_budget, RESUME_SECTIONS, RESUME_TRIM_ORDER)
+    _record("resume", result)
+    return result
+
+
+@lru_cache(maxsize=64)
+def compact_job_description(text: str, token_budget: int = JD_TOKEN_BUDGET) -> CompactionResult:
+    """Compacts a job description for prompting, dropping company boilerplate first."""
+    result = compact_text(text, token_budget, JD_SECTIONS, JD_TRIM_ORDER)
+    _record("job_description", result)
+    return result
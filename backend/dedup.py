@@ -0,0 +1,100 @@
+import os
+import re
+import unicodedata
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cache import sha256_hex
+
+# Estimated Jaccard similarity of word shingles above which two resumes are the same candidate; 0 = exact only
+DEDUP_NEAR_THRESHOLD = float(os.getenv("DEDUP_NEAR_THRESHOLD", "0.9"))
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs at Jaccard 0.9 share a band with probability ~0.9999, pairs at 0.5 ~0.06
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+MERSENNE_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(20240601)  # Fixed seed: signatures are persisted and compared across runs
+_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+WORD = re.compile(r"\w+")
+
+
+def normalized_words(text: str) -> List[str]:
+    """Casefolded words with punctuation, layout and unicode variants removed."""
+    return WORD.findall(unicodedata.normalize("NFKC", text or "").casefold())
+
+
+def content_hash(text: str) -> str:
+    """Exact-duplicate key: identical after normalization, e.g. the same PDF re-exported with other line breaks."""
+    return sha256_hex(" ".join(normalized_words(text)))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash signature over word shingles, computed for all permutations in one vectorized pass."""
+    words = normalized_words(text)
+    shingles = {" ".join(words[start:start + SHINGLE_WORDS])
+                for start in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64,
+                         count=len(shingles)) % MERSENNE_PRIME
+    # (a * x + b) mod p stays below 2**62, so uint64 arithmetic never overflows
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % MERSENNE_PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> List[str]:
+    """LSH bucket keys; resumes sharing any key are near-duplicate candidates."""
+    return [f"{band}:{signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes().hex()}" for band in range(LSH_BANDS)]
+
+
+def estimated_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity: the share of matching signature positions."""
+    return float(np.mean(first == second))
+
+
+def best_match(signature: np.ndarray, candidates: Dict, threshold: float):
+    """Key of the most similar candidate signature at or above the threshold, or None."""
+    best, best_similarity = None, threshold
+    for key, candidate in candidates.items():
+        similarity = estimated_similarity(signature, candidate)
+        if similarity >= best_similarity:
+            best, best_similarity = key, similarity
+    return best
+
+
+class DuplicateIndex:
+    """Finds exact and near-duplicate resumes as they are added, in one pass.
+
+    Exact duplicates match on ``content_hash``; near duplicates are LSH
+    candidates whose estimated similarity reaches the threshold.
+    """
+
+    def __init__(self, threshold: float = DEDUP_NEAR_THRESHOLD):
+        self.threshold = threshold
+        self._exact: Dict[str, int] = {}
+        self._buckets: Dict[str, List[int]] = {}
+        self.signatures: Dict[int, np.ndarray] = {}  # Of the resumes that are not duplicates
+
+    def add(self, key: int, text: str) -> Optional[int]:
+        """Adds a resume and returns the key of the earlier resume it duplicates, or None if it is new."""
+        exact = content_hash(text)
+        if exact in self._exact:
+            return self._exact[exact]
+        if self.threshold <= 0:
+            self._exact[exact] = key
+            return None
+        signature = minhash_signature(text)
+        buckets = band_keys(signature)
+        best = best_match(signature, {candidate: self.signatures[candidate] for bucket in buckets
+                                      for candidate in self._buckets.get(bucket, ())}, self.threshold)
+        if best is not None:
+            self._exact[exact] = best  # Later exact copies point at the original, not at this duplicate
+            return best
+        self._exact[exact] = key
+        self.signatures[key] = signature
+        for bucket in buckets:
+            self._buckets.setdefault(bucket, []).append(key)
+        return None
@@ -0,0 +1,336 @@
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, the index stays in memory
+    fcntl = None
+
+import numpy as np
+
+from cache import sha256_hex
+from compaction import RESUME_SECTIONS, detect_sections, normalize_lines
+from llm_client import GEMINI_EMBEDDING_MODEL, estimate_tokens, get_llm_client
+from metrics import metrics
+from prescreen import tokenize
+from skills import find_skills
+
+# Embedding backend: "hashing" (local, no extra dependencies), "sentence-transformers" or "gemini"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))  # Hashing embedder only
+SENTENCE_TRANSFORMER_MODEL = os.getenv("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_CHUNK_TOKENS = int(os.getenv("EMBEDDING_CHUNK_TOKENS", "256"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Directory of the on-disk vector index; empty keeps vectors in memory only
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                    "embedding_index"))
+
+SKILL_FEATURE_WEIGHT = 2.0  # Canonical skills count double, so "k8s" and "Kubernetes" land close together
+
+
+class HashingEmbedder:
+    """Local, deterministic embedder: signed feature hashing of unigrams, bigrams and canonical skills.
+
+    Needs nothing beyond NumPy and gives the same vector for the same text in
+    every process, so its vectors can be stored and reused across runs.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> Counter:
+        tokens = tokenize(text)
+        features = Counter(tokens)
+        features.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        for skill in find_skills(text):
+            features[f"skill:{skill}"] += SKILL_FEATURE_WEIGHT
+        return features
+
+    def embed(self, texts: List[str], query: bool = False) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dim] += sign * (1.0 + np.log(count))
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    """Local transformer model via the optional ``sentence-transformers`` package."""
+
+    def __init__(self, model_name: str = SENTENCE_TRANSFORMER_MODEL):
+        from sentence_transformers import SentenceTransformer  # Optional dependency
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts: List[str], query: bool = False) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), batch_size=EMBEDDING_BATCH_SIZE), dtype=np.float32)
+
+
+class GeminiEmbedder:
+    """Provider embeddings through the shared LLM client (rate limits, retries, metrics).
+
+    Vectors are cached in the index by chunk hash, so each chunk is only paid for once.
+    """
+
+    def __init__(self, client=None, model_name: str = GEMINI_EMBEDDING_MODEL):
+        self.client = client or get_llm_client()
+        self.model_name = model_name
+        self.dim = len(self.client.embed(["dimension probe"], self.model_name)[0])
+        self.name = f"gemini-{self.model_name}"
+
+    def embed(self, texts: List[str], query: bool = False) -> np.ndarray:
+        task_type = "retrieval_query" if query else "retrieval_document"
+        return np.asarray(self.client.embed(texts, self.model_name, task_type=task_type), dtype=np.float32)
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+    "gemini": GeminiEmbedder,
+}
+
+
+def create_embedder(backend: str = EMBEDDING_BACKEND):
+    """Builds the configured embedder."""
+    if backend not in EMBEDDERS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {', '.join(EMBEDDERS)}")
+    return EMBEDDERS[backend]()
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scales rows to unit length so dot products are cosine similarities; zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def chunk_text(text: str, chunk_tokens: int = EMBEDDING_CHUNK_TOKENS) -> List[str]:
+    """Splits resume text into chunks of about chunk_tokens that never span two sections.
+
+    Lines are packed whole; a single line longer than the budget is split on words.
+    """
+    chunks = []
+    for _, lines in detect_sections(normalize_lines(text), RESUME_SECTIONS):
+        current, current_tokens = [], 0
+        for line in lines:
+            tokens = estimate_tokens(line)
+            if tokens > chunk_tokens:  # Pending lines (e.g. the heading) lead the first piece
+                words = " ".join(current + [line]).split()
+                step = max(1, len(words) * chunk_tokens // (tokens + current_tokens))
+                chunks.extend(" ".join(words[start:start + step]) for start in range(0, len(words), step))
+                current, current_tokens = [], 0
+                continue
+            if current and current_tokens + tokens > chunk_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += tokens
+        if current:
+            chunks.append("\n".join(current))
+    return chunks
+
+
+class VectorIndex:
+    """Append-only store of unit vectors keyed by content hash, backed by a NumPy memmap on disk.
+
+    ``<name>.f32`` holds the float32 rows and ``<name>.keys`` one key per line.
+    Vectors are flushed before their keys are appended, so after a crash the
+    keys never point past the written vectors. Processes sharing a directory
+    open, grow and append under an exclusive lock on ``<name>.lock`` and first
+    read the keys the others appended, so each row is written by exactly one
+    of them and the file never shrinks.
+    Without a directory, or without ``fcntl``, the index lives in memory.
+    """
+
+    def __init__(self, dim: int, directory: Optional[str] = None, name: str = "vectors"):
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._keys_path = None
+        self._vectors_path = None
+        self._lock_path = None
+        self._keys_offset = 0  # Bytes of the keys file already read into _rows
+        self._count = 0
+        self._rows: Dict[str, int] = {}
+        self._vectors = None
+        if directory and fcntl is None:
+            logging.warning("File locks are unavailable on this platform; keeping the vector index in memory")
+        elif directory:
+            os.makedirs(directory, exist_ok=True)
+            safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+            self._keys_path = os.path.join(directory, f"{safe_name}.keys")
+            self._vectors_path = os.path.join(directory, f"{safe_name}.f32")
+            self._lock_path = os.path.join(directory, f"{safe_name}.lock")
+        with self._file_lock():  # Growing the file must not race another process's append
+            self._sync()
+            self._vectors = self._open(max(self._count, 1024))
+
+    @contextmanager
+    def _file_lock(self):
+        """Holds the exclusive inter-process lock on the index files; a no-op for in-memory indexes."""
+        if self._lock_path is None:
+            yield
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """Reads keys appended by other processes since the last read; call with the file lock held."""
+        if self._keys_path is None or not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path, "rb") as keys_file:
+            keys_file.seek(self._keys_offset)
+            appended = keys_file.read()
+        appended = appended[:appended.rfind(b"\n") + 1]  # A line cut short by a crash is not a key yet
+        self._keys_offset += len(appended)
+        written = os.path.getsize(self._vectors_path) // (4 * self.dim) if os.path.exists(self._vectors_path) else 0
+        for key in appended.decode("utf-8").split():
+            if self._count >= written:
+                break
+            self._rows.setdefault(key, self._count)
+            self._count += 1
+        if self._vectors is not None and self._count > len(self._vectors):
+            self._vectors = self._open(self._count)  # Another process grew the file
+
+    def _open(self, capacity: int) -> np.ndarray:
+        """Maps at least capacity rows; call with the file lock held. The file only ever grows."""
+        if self._vectors_path is None:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            if self._vectors is not None:
+                vectors[:self._count] = self._vectors[:self._count]
+            return vectors
+        # Growing the file keeps existing rows in place; the memmap is reopened over the new size
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        if size < capacity * self.dim * 4:
+            with open(self._vectors_path, "ab") as vectors_file:
+                vectors_file.truncate(capacity * self.dim * 4)
+        capacity = max(capacity, size // (4 * self.dim))
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def rows_for(self, keys: Sequence[str]) -> Dict[str, int]:
+        """Returns {key: row} for the keys already in the index, including those other processes added."""
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                with self._file_lock():
+                    self._sync()
+            return {key: self._rows[key] for key in keys if key in self._rows}
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> List[int]:
+        """Stores normalized vectors under their keys (existing keys keep their row); returns the rows."""
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        with self._lock, self._file_lock():
+            self._sync()  # Rows other processes appended since the last read are taken
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows:
+                    new.setdefault(key, vector)
+            if new:
+                if self._count + len(new) > len(self._vectors):
+                    self._vectors = self._open(max(2 * len(self._vectors), self._count + len(new)))
+                start = self._count
+                self._vectors[start:start + len(new)] = np.stack(list(new.values()))
+                if isinstance(self._vectors, np.memmap):
+                    self._vectors.flush()
+                    encoded = "".join(f"{key}\n" for key in new).encode("utf-8")
+                    with open(self._keys_path, "ab") as keys_file:
+                        keys_file.write(encoded)
+                    self._keys_offset += len(encoded)
+                for offset, key in enumerate(new):
+                    self._rows[key] = start + offset
+                self._count += len(new)
+            return [self._rows[key] for key in keys]
+
+    def matrix(self, rows: Sequence[int]) -> np.ndarray:
+        """Returns the vectors at the given rows as one in-memory matrix."""
+        with self._lock:
+            return np.asarray(self._vectors[np.asarray(rows, dtype=np.int64)])
+
+
+class SemanticScorer:
+    """Scores resumes against a job description by embedding cosine similarity.
+
+    Every chunk is embedded once per embedder and kept in the vector index, so
+    re-scoring the same resumes (for another JD or a repeated run) only embeds
+    the query. A resume's score is its best chunk's similarity to the JD.
+    """
+
+    def __init__(self, embedder, index: VectorIndex):
+        self.embedder = embedder
+        self.index = index
+
+    def _key(self, chunk: str) -> str:
+        return sha256_hex(f"{self.embedder.name}\n{chunk}")
+
+    def embed_chunks(self, chunks: Sequence[str]) -> List[int]:
+        """Returns index rows for chunks, embedding the unseen ones in batches."""
+        keys = [self._key(chunk) for chunk in chunks]
+        known = self.index.rows_for(keys)
+        missing = {}
+        for key, chunk in zip(keys, chunks):
+            if key not in known:
+                missing.setdefault(key, chunk)
+        if missing:
+            pending = list(missing.items())
+            with metrics.timer("embedding"):
+                for start in range(0, len(pending), EMBEDDING_BATCH_SIZE):
+                    batch = pending[start:start + EMBEDDING_BATCH_SIZE]
+                    vectors = self.embedder.embed([chunk for _, chunk in batch])
+                    self.index.add([key for key, _ in batch], vectors)
+            metrics.inc("smartscreen_embedding_chunks_total", len(pending),
+                        help="Chunks embedded, excluding those already in the vector index.", embedder=self.embedder.name)
+        rows = self.index.rows_for(keys)
+        return [rows[key] for key in keys]
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Unit vector for a job description: the normalized mean of its chunk embeddings."""
+        chunks = chunk_text(text) or [text]
+        vectors = normalize_rows(np.asarray(self.embedder.embed(chunks, query=True), dtype=np.float32))
+        return normalize_rows(vectors.mean(axis=0, keepdims=True))[0]
+
+    def scores(self, query_text: str, texts: Sequence[str]) -> np.ndarray:
+        """Returns a 0-100 similarity score per text, computed as one matrix-vector product over all chunks."""
+        chunked = [chunk_text(text) for text in texts]
+        owners = [position for position, chunks in enumerate(chunked) for _ in chunks]
+        result = np.zeros(len(texts))
+        if not owners:
+            return result
+        rows = self.embed_chunks([chunk for chunks in chunked for chunk in chunks])
+        similarities = self.index.matrix(rows) @ self.embed_query(query_text)
+        # Chunks are grouped by owner, so the best chunk per text is one segmented max
+        owners = np.asarray(owners)
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        result[owners[starts]] = np.maximum.reduceat(similarities, starts)
+        return np.round(np.clip(result, 0, 1) * 100, 1)
+
+
+_default_scorer = None
+_default_scorer_lock = threading.Lock()
+
+
+def get_semantic_scorer() -> SemanticScorer:
+    """Returns the process-wide scorer for the configured embedder and index directory."""
+    global _default_scorer
+    if _default_scorer is None:
+        with _default_scorer_lock:
+            if _default_scorer is None:
+                embedder = create_embedder()
+                index = VectorIndex(embedder.dim, EMBEDDING_INDEX_DIR or None, embedder.name)
+                logging.info(f"Semantic scorer: {embedder.name}, {len(index)} indexed chunks")
+                _default_scorer = SemanticScorer(embedder, index)
+    return _default_scorer
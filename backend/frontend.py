@@ -1,8 +1,9 @@
 import streamlit as st  # Ensure Streamlit is imported
 from backend import ATSBackend, BulkATSBackend  # Removed circular import
+from metrics import log_payload
 from dotenv import load_dotenv
 import requests  # Ensure requests is imported if used
-import logging  # Added for logging
+import pandas as pd
 
 # Load environment variables from .env file
 load_dotenv()
@@ -93,7 +94,7 @@ class ATSFrontend:
         resume_text = self.ats_backend.extract_text_from_pdf(st.session_state.uploaded_file)
         
         # Log the extracted resume text for debugging
-        logging.info(f"Extracted Resume Text: {resume_text}")  # Log the extracted text
+        log_payload("Extracted Resume Text", resume_text)  # Full text only with LOG_PAYLOADS=true
 
         # Ensure resume_text is a string before passing it to analyze_resume
         if not isinstance(resume_text, str):
@@ -152,6 +153,7 @@ class ATSFrontend:
         st.sidebar.header("Upload Bulk Resumes")
         
         uploaded_file = st.sidebar.file_uploader("Upload ZIP file containing resumes", type=["zip"])
+        bulk_session = self.bulk_backend.new_session()  # Resumes from this upload only
 
         if uploaded_file is not None:
             st.session_state.uploaded_file = uploaded_file
@@ -159,7 +161,7 @@ class ATSFrontend:
 
             # Process the uploaded ZIP file
             try:
-                self.bulk_backend.extract_text_from_zip(uploaded_file)
+                bulk_session.extract_text_from_zip(uploaded_file)
                 st.success("Resumes extracted successfully!")
             except Exception as e:
                 st.error(f"Error processing ZIP file: {str(e)}")
@@ -172,7 +174,8 @@ class ATSFrontend:
         if uploaded_file and job_description:
             with st.spinner("Processing bulk resumes..."):
                 try:
-                    results_df = self.bulk_backend.process_bulk_resumes(job_description)  # Process resumes
+                    # Process resumes; includes the local "Pre-screen Score" column
+                    results_df = pd.DataFrame(bulk_session.process_bulk_resumes(job_description))
                     st.write("### Results:")
                     st.dataframe(results_df)  # Display results in a table
 
@@ -222,11 +225,11 @@ class ATSFrontend:
                 self.ats_backend.resume_text = resume_text
                 self.ats_backend.job_description = job_description
 
-                # Perform analysis
-                suitability_analysis = self.ats_backend.analyze_resume(resume_text, job_description)
-                keyword_analysis = self.ats_backend.get_keyword_optimization()
-                formatting_analysis = self.ats_backend.get_formatting_suggestions()
-                resume_review = self.ats_backend.get_resume_analysis()
+                # Perform analysis (one combined LLM call, cached per resume/JD pair)
+                suitability_analysis = self.ats_backend.get_combined_analysis()
+                keyword_analysis = suitability_analysis['Keyword Analysis']
+                formatting_analysis = suitability_analysis['Formatting Review']
+                resume_review = suitability_analysis['Resume Review']
 
                 st.success("✅ Analysis Complete!")
                 st.subheader("🔍 Analysis Summary")
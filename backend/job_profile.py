@@ -0,0 +1,126 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from cache import LRUCache
+from compaction import HEADER, JD_SECTIONS, compact_job_description, detect_sections, normalize_lines
+from llm_client import estimate_tokens
+from prescreen import STOPWORDS, tokenize
+from result_store import job_description_hash
+from skills import SKILL_ALIASES, canonical_skill, find_skills
+
+# JD sections whose terms count as nice-to-have, and boilerplate sections ignored for matching
+OPTIONAL_SECTIONS = ("preferred",)
+IGNORED_SECTIONS = ("about", "benefits", "equal_opportunity")
+OPTIONAL_TERM_WEIGHT = 0.5
+
+# "Nice to have: Kafka, Redis" inside an otherwise required line
+INLINE_OPTIONAL = re.compile(r"\b(?:nice to have|preferred|bonus|a plus|plus)\s*:", re.IGNORECASE)
+LIST_SEPARATORS = re.compile(r"[,;•|]|\band\b|\bor\b|:", re.IGNORECASE)
+PARENTHESES = re.compile(r"[()\[\]]")
+LEADING_FILLER = re.compile(
+    r"^(?:(?:strong|solid|good|excellent|proven|hands-on|working|deep|basic)\s+)*"
+    r"(?:experience|knowledge|proficiency|familiarity|expertise|understanding|skills?)\s+(?:with|of|in)\s+",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class JobProfile:
+    """Everything derived from a job description, computed once and shared by every resume scored against it."""
+
+    jd_hash: str
+    text: str  # Whitespace-normalized JD
+    prompt_text: str  # Compacted and sanitized JD embedded in prompts
+    token_estimate: int  # Estimated tokens of prompt_text
+    required_skills: Tuple[str, ...]
+    optional_skills: Tuple[str, ...]
+    terms: Tuple[str, ...]  # Sorted query terms for keyword scoring
+    term_weights: np.ndarray  # Weight per term: 1 for required, OPTIONAL_TERM_WEIGHT for nice-to-have
+
+    @property
+    def skills(self) -> Tuple[str, ...]:
+        return self.required_skills + self.optional_skills
+
+
+def _list_terms(line: str):
+    """Short items of comma/semicolon-separated lists, e.g. "Python, Go, REST APIs".
+
+    Multi-word items must look like names (capitalized or containing symbols),
+    which keeps clauses such as "operate backend services" out.
+    """
+    if len(LIST_SEPARATORS.findall(line)) < 2:
+        return set()
+    terms = set()
+    for fragment in LIST_SEPARATORS.split(PARENTHESES.sub(",", line)):
+        fragment = LEADING_FILLER.sub("", fragment.strip(" .-*\t"))
+        words = fragment.split()
+        if not 1 <= len(words) <= 3 or words[0].lower() in STOPWORDS or fragment[0].isdigit():
+            continue
+        term = canonical_skill(fragment)
+        if len(words) == 1 or term in SKILL_ALIASES or not fragment.islower():
+            terms.add(term)
+    return terms
+
+
+def build_job_profile(job_description: str, sanitize: Optional[Callable[[str], str]] = None) -> JobProfile:
+    """Splits the JD into required, nice-to-have and boilerplate parts and derives skills and term weights."""
+    required_lines, optional_lines = [], []
+    for section, lines in detect_sections(normalize_lines(job_description), JD_SECTIONS):
+        if section in IGNORED_SECTIONS:
+            continue
+        if section != HEADER:
+            lines = lines[1:]  # Skip the heading itself
+        for line in lines:
+            if section in OPTIONAL_SECTIONS:
+                optional_lines.append(line)
+                continue
+            required_part, *optional_parts = INLINE_OPTIONAL.split(line, maxsplit=1)
+            required_lines.append(required_part)
+            optional_lines.extend(optional_parts)
+
+    def skills_in(lines):
+        found = set()
+        for line in lines:
+            found |= find_skills(line) | _list_terms(line)
+        return found
+
+    required_skills = skills_in(required_lines)
+    optional_skills = skills_in(optional_lines) - required_skills
+
+    required_terms = set(tokenize(" ".join(required_lines)))
+    if not required_lines and not optional_lines:
+        required_terms = set(tokenize(job_description))  # Nothing but boilerplate: score on the whole JD
+    optional_terms = set(tokenize(" ".join(optional_lines))) - required_terms
+    terms = tuple(sorted(required_terms | optional_terms))
+    weights = np.array([1.0 if term in required_terms else OPTIONAL_TERM_WEIGHT for term in terms])
+
+    prompt_text = compact_job_description(job_description).text
+    if sanitize is not None:
+        prompt_text = sanitize(prompt_text)
+    return JobProfile(
+        jd_hash=job_description_hash(job_description),
+        text=" ".join(job_description.split()),
+        prompt_text=prompt_text,
+        token_estimate=estimate_tokens(prompt_text),
+        required_skills=tuple(sorted(required_skills)),
+        optional_skills=tuple(sorted(optional_skills)),
+        terms=terms,
+        term_weights=weights,
+    )
+
+
+job_profile_cache = LRUCache(max_entries=int(os.getenv("JOB_PROFILE_CACHE_SIZE", "64")))
+
+
+def get_job_profile(job_description: str, sanitize: Optional[Callable[[str], str]] = None) -> JobProfile:
+    """Returns the cached profile for a JD (keyed by its whitespace-normalized hash), building it on first use."""
+    key = job_description_hash(job_description)
+    profile = job_profile_cache.get(key)
+    if profile is None:
+        profile = build_job_profile(job_description, sanitize)
+        job_profile_cache.set(key, profile)
+    return profile
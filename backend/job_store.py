@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Job statuses
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STATUSES = (COMPLETED, FAILED)
+
+
+class InMemoryJobStore:
+    """Keeps job state in process memory. Finished jobs are dropped after ttl seconds."""
+
+    def __init__(self, ttl: float = 24 * 3600):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> str:
+        """Creates a pending job and returns its ID."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._jobs[job_id] = {"status": PENDING, "total": 0, "error": None,
+                                  "created_at": now, "updated_at": now, "results": {}}
+        return job_id
+
+    def _prune(self, now: float):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["status"] in FINISHED_STATUSES and now - job["updated_at"] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def update(self, job_id: str, **fields):
+        """Updates status, total or error of a job."""
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job["updated_at"] = time.time()
+
+    def add_result(self, job_id: str, index: int, row: dict):
+        """Records the result row for the resume at position index."""
+        with self._lock:
+            job = self._jobs[job_id]
+            job["results"][index] = row
+            job["updated_at"] = time.time()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Returns a snapshot of the job with its results ordered by index, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            results = [job["results"][index] for index in sorted(job["results"])]
+            return _job_snapshot(job_id, job["status"], job["total"], job["error"],
+                                 job["created_at"], job["updated_at"], results)
+
+
+class SQLiteJobStore:
+    """Keeps job state in a SQLite file so it is shared by worker processes and survives restarts."""
+
+    def __init__(self, db_path: str, ttl: float = 24 * 3600):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, total INTEGER NOT NULL, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_results ("
+                "job_id TEXT NOT NULL, idx INTEGER NOT NULL, row TEXT NOT NULL, PRIMARY KEY (job_id, idx))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def create(self) -> str:
+        """Creates a pending job and returns its ID."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as conn:
+            expired = "SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?"
+            params = (*FINISHED_STATUSES, now - self.ttl)
+            conn.execute(f"DELETE FROM job_results WHERE job_id IN ({expired})", params)
+            conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", params)
+            conn.execute(
+                "INSERT INTO jobs (id, status, total, error, created_at, updated_at) VALUES (?, ?, 0, NULL, ?, ?)",
+                (job_id, PENDING, now, now),
+            )
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        """Updates status, total or error of a job."""
+        columns = [column for column in ("status", "total", "error") if column in fields]
+        assignments = ", ".join(f"{column} = ?" for column in columns + ["updated_at"])
+        with self._connection() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?",
+                         [fields[column] for column in columns] + [time.time(), job_id])
+
+    def add_result(self, job_id: str, index: int, row: dict):
+        """Records the result row for the resume at position index."""
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO job_results (job_id, idx, row) VALUES (?, ?, ?)",
+                         (job_id, index, json.dumps(row, default=str)))
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Returns a snapshot of the job with its results ordered by index, or None."""
+        conn = self._connection()
+        job = conn.execute(
+            "SELECT status, total, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if job is None:
+            return None
+        rows = conn.execute("SELECT row FROM job_results WHERE job_id = ? ORDER BY idx", (job_id,)).fetchall()
+        return _job_snapshot(job_id, *job, [json.loads(row[0]) for row in rows])
+
+
+def _job_snapshot(job_id, status, total, error, created_at, updated_at, results) -> dict:
+    return {
+        "job_id": job_id,
+        "status": status,
+        "total": total,
+        "completed": len(results),
+        "progress": round(len(results) / total, 4) if total else (1.0 if status == COMPLETED else 0.0),
+        "error": error,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "results": results,
+    }
+
+
+class JobContext:
+    """Handle a running task uses to report its progress."""
+
+    def __init__(self, store, job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    def set_total(self, total: int):
+        self.store.update(self.job_id, total=total)
+
+    def add_result(self, index: int, row: dict):
+        self.store.add_result(self.job_id, index, row)
+
+
+class JobQueue:
+    """Runs submitted tasks on a background thread pool and tracks them in a job store."""
+
+    def __init__(self, store, max_workers: int = 2):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, task, *args) -> str:
+        """Queues task(JobContext, *args) and returns the job ID immediately."""
+        job_id = self.store.create()
+        self._executor.submit(self._run, job_id, task, args)
+        return job_id
+
+    def _run(self, job_id: str, task, args):
+        self.store.update(job_id, status=RUNNING)
+        try:
+            task(JobContext(self.store, job_id), *args)
+            self.store.update(job_id, status=COMPLETED)
+        except Exception as e:
+            logging.exception(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, status=FAILED, error=str(e))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Returns the job snapshot or None."""
+        return self.store.get(job_id)
+
+
+def create_job_store():
+    """Builds the job store from the environment: SQLite at JOB_STORE_DB, or memory when it is set to ""."""
+    ttl = float(os.getenv("JOB_TTL", str(24 * 3600)))
+    db_path = os.getenv("JOB_STORE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db"))
+    if db_path:
+        return SQLiteJobStore(db_path, ttl=ttl)
+    return InMemoryJobStore(ttl=ttl)
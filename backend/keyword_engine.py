@@ -0,0 +1,151 @@
+import os
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Tuple
+
+from cache import LRUCache
+from job_profile import JobProfile
+from skills import AMBIGUOUS_ALIASES, SKILL_ALIASES, alias_map
+
+# Characters that continue a token, so a keyword next to them is part of a longer word
+WORD_CHARACTERS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789+#")
+# Very short ambiguous aliases ("C", "R", "Go") only count when written with a capital letter
+CASE_SENSITIVE_MAX_LENGTH = 2
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton mapping surface forms to canonical keywords.
+
+    Matching is one pass over the text regardless of the number of keywords.
+    A match counts only on word boundaries.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str, bool]]] = [[]]
+        for surface, canonical in patterns.items():
+            self._add(" ".join(surface.lower().split()), canonical)
+        self._build_failure_links()
+
+    def _add(self, surface: str, canonical: str):
+        node = 0
+        for char in surface:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        case_sensitive = surface in AMBIGUOUS_ALIASES and len(surface) <= CASE_SENSITIVE_MAX_LENGTH
+        self._output[node].append((len(surface), canonical, case_sensitive))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yields (start, end, canonical) for every keyword occurrence in whitespace-normalized text."""
+        text = " ".join(text.split())
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for position, original in enumerate(text):
+            char = original.lower()
+            if len(char) != 1:
+                char = original
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not output[node]:
+                continue
+            end = position + 1
+            if end < len(text) and text[end].lower() in WORD_CHARACTERS:
+                continue
+            for length, canonical, case_sensitive in output[node]:
+                start = end - length
+                if start > 0 and (text[start - 1].lower() in WORD_CHARACTERS or text[start - 1] == "."):
+                    continue
+                if case_sensitive and text[start:end].islower():
+                    continue
+                yield start, end, canonical
+
+    def find(self, text: str) -> set:
+        """Returns the canonical keywords present in text."""
+        return {canonical for _, _, canonical in self.iter_matches(text)}
+
+
+@dataclass
+class KeywordMatch:
+    found: List[str]
+    missing: List[str]
+    found_optional: List[str]
+    missing_optional: List[str]
+    other_skills: List[str]  # Vocabulary skills in the resume that the JD does not ask for
+    coverage: float  # Percent of the JD's required keywords present (all keywords if none are required)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def to_prompt(self) -> str:
+        """Summary handed to the LLM so it does not have to search for keywords itself."""
+        def listed(items):
+            return ", ".join(items) if items else "none"
+        return (f"Keyword match (computed locally from a skills vocabulary, may miss domain terms): coverage {self.coverage:g}% of required "
+                f"keywords.\nFound required keywords: {listed(self.found)}\n"
+                f"Missing required keywords: {listed(self.missing)}\n"
+                f"Found nice-to-have keywords: {listed(self.found_optional)}\n"
+                f"Missing nice-to-have keywords: {listed(self.missing_optional)}")
+
+
+class KeywordEngine:
+    """Matches resumes against one job profile's keywords plus the shared skills vocabulary."""
+
+    def __init__(self, profile: JobProfile):
+        self.profile = profile
+        requested = set(profile.skills)
+        patterns = {}
+        for surface, canonical in alias_map().items():
+            # Ambiguous aliases only when the JD asks for that skill
+            if surface not in AMBIGUOUS_ALIASES or canonical in requested:
+                patterns[surface] = canonical
+        for term in requested:
+            patterns.setdefault(term, term)  # JD terms outside the vocabulary match literally
+        self.automaton = KeywordAutomaton(patterns)
+
+    def match(self, resume_text: str) -> KeywordMatch:
+        present = self.automaton.find(resume_text or "")
+        required, optional = self.profile.required_skills, self.profile.optional_skills
+        found = [skill for skill in required if skill in present]
+        found_optional = [skill for skill in optional if skill in present]
+        scored = required or optional
+        coverage = 100 * len(found if required else found_optional) / len(scored) if scored else 0.0
+        return KeywordMatch(
+            found=found,
+            missing=[skill for skill in required if skill not in present],
+            found_optional=found_optional,
+            missing_optional=[skill for skill in optional if skill not in present],
+            other_skills=sorted(skill for skill in present - set(required) - set(optional) if skill in SKILL_ALIASES),
+            coverage=round(coverage, 1),
+        )
+
+
+keyword_engine_cache = LRUCache(max_entries=int(os.getenv("JOB_PROFILE_CACHE_SIZE", "64")))
+
+
+def get_keyword_engine(profile: JobProfile) -> KeywordEngine:
+    """Returns the cached engine for a job profile, building its automaton on first use."""
+    engine = keyword_engine_cache.get(profile.jd_hash)
+    if engine is None:
+        engine = KeywordEngine(profile)
+        keyword_engine_cache.set(profile.jd_hash, engine)
+    return engine
@@ -0,0 +1,192 @@
+import inspect
+import logging
+import os
+import threading
+from typing import Callable, List, Optional
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from dotenv import load_dotenv
+
+from cache import ResponseCache, response_cache_key
+from metrics import metrics
+from rate_limiter import LLMScheduler
+
+load_dotenv()
+
+# Central LLM configuration; every prompt method reads these through the shared client
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro-latest")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": float(os.getenv("GEMINI_TEMPERATURE", "0.5")),
+    "max_output_tokens": int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "2048")),
+}
+# Most output tokens the model can produce in one response (gemini-1.5: 8192); callers size requests to fit it
+GEMINI_OUTPUT_TOKEN_LIMIT = int(os.getenv("GEMINI_OUTPUT_TOKEN_LIMIT", "8192"))
+GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "models/embedding-001")
+
+# JSON-mode responses need SDK support for response_mime_type; older SDKs rely on prompt instructions only
+SUPPORTS_JSON_MODE = "response_mime_type" in glm.GenerationConfig.meta.fields
+JSON_MODE_CONFIG = {"response_mime_type": "application/json"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for prompt budgeting and metrics."""
+    return len(text) // 4 + 1
+
+
+class LLMClient:
+    """Thread-safe Gemini client that configures the SDK once and reuses its model objects.
+
+    The SDK keeps one gRPC channel per process, so reusing the configured
+    ``GenerativeModel`` instances avoids rebuilding request plumbing per call.
+    """
+
+    def __init__(self, model_name: str = GEMINI_MODEL, generation_config: Optional[dict] = None,
+                 timeout: Optional[float] = GEMINI_TIMEOUT, api_key: Optional[str] = None,
+                 response_cache=None, scheduler: Optional[LLMScheduler] = None):
+        self.model_name = model_name
+        self.generation_config = dict(DEFAULT_GENERATION_CONFIG if generation_config is None else generation_config)
+        self.timeout = timeout
+        self.response_cache = response_cache if response_cache is not None else ResponseCache(
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        )
+        # Rate limits, retries and the circuit breaker for every call made through this client
+        self.scheduler = scheduler if scheduler is not None else LLMScheduler.from_env()
+        self._api_key = api_key
+        self._models = {}
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def _configure(self):
+        api_key = self._api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment.")
+        genai.configure(api_key=api_key)
+        self._configured = True
+
+    def get_model(self, model_name: Optional[str] = None):
+        """Returns the shared GenerativeModel for a model name, building it on first use."""
+        model_name = model_name or self.model_name
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                if not self._configured:
+                    self._configure()
+                model = self._models.get(model_name)
+                if model is None:
+                    model = genai.GenerativeModel(model_name)
+                    self._models[model_name] = model
+        return model
+
+    def use_model(self, model, model_name: Optional[str] = None):
+        """Serves a model name from a pre-built object with a generate_content method, e.g. an offline fake."""
+        self._models[model_name or self.model_name] = model
+
+    @property
+    def model(self):
+        """The default model."""
+        return self.get_model()
+
+    def _request_kwargs(self, model) -> dict:
+        # Per-request timeouts are only available in newer SDK releases
+        if self.timeout and "request_options" in inspect.signature(model.generate_content).parameters:
+            return {"request_options": {"timeout": self.timeout}}
+        return {}
+
+    def generate(self, prompt: str, generation_config: Optional[dict] = None,
+                 model_name: Optional[str] = None, use_cache: bool = True, json_mode: bool = False,
+                 priority: Optional[int] = None, validate: Optional[Callable[[str], object]] = None) -> str:
+        """Returns the model's text for a prompt, serving identical requests from the response cache.
+
+        ``json_mode`` asks the model for a JSON response when the installed SDK supports it.
+        Calls go through the scheduler in the ``priority`` lane (default: the lane set
+        with ``rate_limiter.llm_priority``, else interactive). A response for which
+        ``validate(text)`` raises is still returned but not cached, so a retry asks the model again.
+        """
+        model = self.get_model(model_name)
+        config = dict(self.generation_config)
+        if json_mode and SUPPORTS_JSON_MODE:
+            config.update(JSON_MODE_CONFIG)
+        config.update(generation_config or {})
+        key = response_cache_key(prompt, model.model_name, config)
+        if use_cache:
+            text = self.response_cache.get(key)
+            if text is not None:
+                return text
+
+        model_label = model_name or self.model_name
+
+        def call():
+            with metrics.timer("llm"):
+                return model.generate_content(prompt, generation_config=config, **self._request_kwargs(model)).text
+
+        try:
+            text = self.scheduler.run(call, tokens=estimate_tokens(prompt), priority=priority)
+        except Exception as e:
+            logging.error(f"LLM generation failed: {e}")
+            metrics.inc("smartscreen_llm_requests_total", help="LLM calls by model and outcome.",
+                        model=model_label, outcome="error")
+            raise
+
+        metrics.inc("smartscreen_llm_requests_total", help="LLM calls by model and outcome.",
+                    model=model_label, outcome="ok")
+        metrics.inc("smartscreen_llm_tokens_total", estimate_tokens(prompt),
+                    help="Estimated LLM tokens (~4 chars/token) by direction.", direction="prompt")
+        metrics.inc("smartscreen_llm_tokens_total", estimate_tokens(text or ""),
+                    help="Estimated LLM tokens (~4 chars/token) by direction.", direction="completion")
+
+        if text and use_cache and self._is_valid(text, validate):
+            self.response_cache.set(key, text)
+        return text
+
+    @staticmethod
+    def _is_valid(text: str, validate: Optional[Callable[[str], object]]) -> bool:
+        if validate is None:
+            return True
+        try:
+            validate(text)
+            return True
+        except Exception as e:
+            logging.info(f"Not caching a response that failed validation: {e}")
+            return False
+
+    def embed(self, texts: List[str], model_name: str = GEMINI_EMBEDDING_MODEL,
+              task_type: str = "retrieval_document", priority: Optional[int] = None) -> List[List[float]]:
+        """Returns one embedding per text from a single batched request, scheduled like ``generate``."""
+        with self._lock:
+            if not self._configured:
+                self._configure()
+
+        def call():
+            with metrics.timer("embedding"):
+                return genai.embed_content(model=model_name, content=list(texts), task_type=task_type)["embedding"]
+
+        tokens = sum(estimate_tokens(text) for text in texts)
+        try:
+            vectors = self.scheduler.run(call, tokens=tokens, priority=priority)
+        except Exception as e:
+            logging.error(f"Embedding request failed: {e}")
+            metrics.inc("smartscreen_llm_requests_total", help="LLM calls by model and outcome.",
+                        model=model_name, outcome="error")
+            raise
+        metrics.inc("smartscreen_llm_requests_total", help="LLM calls by model and outcome.",
+                    model=model_name, outcome="ok")
+        metrics.inc("smartscreen_llm_tokens_total", tokens,
+                    help="Estimated LLM tokens (~4 chars/token) by direction.", direction="prompt")
+        return vectors
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Returns the process-wide LLM client."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = LLMClient()
+    return _default_client
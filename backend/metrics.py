@@ -0,0 +1,129 @@
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Large payloads (resume text, raw LLM responses) are only logged when LOG_PAYLOADS is enabled
+LOG_PAYLOADS = os.getenv("LOG_PAYLOADS", "false").lower() in ("1", "true", "yes")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+
+def log_payload(label: str, payload):
+    """Logs a large payload in full only when LOG_PAYLOADS is on; otherwise just its size."""
+    if LOG_PAYLOADS:
+        logging.info(f"{label}: {payload}")
+    else:
+        logging.debug(f"{label}: {len(str(payload))} chars (set LOG_PAYLOADS=true to log the content)")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Minimal thread-safe counter/histogram registry rendered in Prometheus text format."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels):
+        """Adds value to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, (help, "counter"))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, help: str = "", **labels):
+        """Records one observation in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, (help, "histogram"))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][position] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Times a pipeline stage into smartscreen_stage_seconds and counts its errors."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc("smartscreen_errors_total", help="Errors raised per pipeline stage.", stage=stage)
+            raise
+        finally:
+            self.observe("smartscreen_stage_seconds", time.perf_counter() - start,
+                         help="Duration of each pipeline stage in seconds.", stage=stage)
+
+    def register_collector(self, collector):
+        """Registers collector() -> iterable of (name, help, labels dict, value) gauges read at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, buckets=list(value["buckets"])) for key, value in self._histograms.items()}
+            help_texts = dict(self._help)
+            collectors = list(self._collectors)
+
+        for name in sorted({name for name, _ in counters}):
+            help_text, metric_type = help_texts[name]
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted({name for name, _ in histograms}):
+            help_text, metric_type = help_texts[name]
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    bucket_labels = labels + (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+        gauges = {}
+        for collector in collectors:
+            try:
+                for name, help_text, labels, value in collector():
+                    gauges.setdefault(name, (help_text, []))[1].append((tuple(sorted(labels.items())), value))
+            except Exception as e:
+                logging.error(f"Metrics collector failed: {e}")
+        for name in sorted(gauges):
+            help_text, samples = gauges[name]
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,213 @@
+import io
+import itertools
+import logging
+import os
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import pdfplumber
+import PyPDF2
+
+from compaction import RESUME_SECTIONS, heading_lookup, match_heading
+from metrics import metrics
+
+# "auto" tries the fast engine and falls back to pdfplumber when its text looks degraded; or force one engine
+PDF_ENGINE = os.getenv("PDF_ENGINE", "auto")
+# Fast-path output below this many characters per page, or above this share of garbage characters, is degraded
+PDF_MIN_CHARS_PER_PAGE = int(os.getenv("PDF_MIN_CHARS_PER_PAGE", "200"))
+PDF_MAX_GARBAGE_RATIO = float(os.getenv("PDF_MAX_GARBAGE_RATIO", "0.05"))
+# Words glued together (lost spaces) or letters spaced apart (one character per word) also mean degraded text
+PDF_MAX_MEAN_WORD_LENGTH = 15
+PDF_MAX_SINGLE_CHARACTER_WORDS = 0.4
+# "auto" judges the fast engine on this many leading pages before streaming the rest
+PDF_PROBE_PAGES = int(os.getenv("PDF_PROBE_PAGES", "1"))
+# Extraction stops at this many estimated tokens of text (0 = whole document), so long CVs cost what the prompt can use
+PDF_MAX_TOKENS = int(os.getenv("PDF_MAX_TOKENS", "12000"))
+# Comma-separated resume sections (e.g. "experience,skills"); extraction stops once all of them are complete
+PDF_STOP_AFTER_SECTIONS = tuple(section.strip() for section in os.getenv("PDF_STOP_AFTER_SECTIONS", "").split(",")
+                                if section.strip())
+CHARS_PER_TOKEN = 4  # Same estimate as llm_client.estimate_tokens
+
+FAST_ENGINE = "pypdf2"
+ACCURATE_ENGINE = "pdfplumber"
+CID_GLYPH = re.compile(r"\(cid:\d+\)")  # Unmapped glyphs as rendered by pdfminer
+
+
+def pypdf2_pages(data: bytes, start: int = 0) -> Iterator[str]:
+    """Page texts from PyPDF2's content-stream extraction: fast, no layout analysis."""
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    for number in range(start, len(reader.pages)):
+        yield reader.pages[number].extract_text() or ""
+
+
+def pdfplumber_pages(data: bytes, start: int = 0) -> Iterator[str]:
+    """Page texts from pdfplumber's per-character layout analysis: slower, more robust."""
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages[start:]:
+            yield page.extract_text() or ""
+            page.flush_cache()  # Drop the page's parsed objects once its text is out
+
+
+ENGINES = {FAST_ENGINE: pypdf2_pages, ACCURATE_ENGINE: pdfplumber_pages}
+
+
+@dataclass
+class PdfExtraction:
+    text: str
+    engine: str  # Engine whose text was kept
+    pages: int
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per engine tried
+    fallback_reason: Optional[str] = None  # Why the fast engine's text was rejected, if it was
+    stop_reason: Optional[str] = None  # "budget" or "sections" when extraction stopped before the last page
+
+
+def degradation_reason(text: str, pages: int) -> Optional[str]:
+    """Returns why extracted text looks degraded (sparse, garbled, glued or spaced-out), or None if it looks fine."""
+    visible = sum(not char.isspace() for char in text)
+    if visible < PDF_MIN_CHARS_PER_PAGE * max(pages, 1):
+        return "low_density"
+    garbage = sum(len(match) for match in CID_GLYPH.findall(text))
+    garbage += sum(char == "�" or unicodedata.category(char) in ("Co", "Cc") and not char.isspace()
+                   for char in text)
+    if garbage / visible > PDF_MAX_GARBAGE_RATIO:
+        return "garbage"
+    words = text.split()
+    if visible / len(words) > PDF_MAX_MEAN_WORD_LENGTH:
+        return "glued_words"
+    if sum(len(word) == 1 for word in words) / len(words) > PDF_MAX_SINGLE_CHARACTER_WORDS:
+        return "spaced_letters"
+    return None
+
+
+def _timed_pages(engine: str, data: bytes, timings: Dict[str, float], start: int = 0) -> Iterator[str]:
+    """Streams an engine's pages, adding the time spent producing them to timings[engine]."""
+    pages = ENGINES[engine](data, start)
+    while True:
+        started = time.perf_counter()
+        try:
+            text = next(pages, None)
+        finally:
+            timings[engine] = timings.get(engine, 0.0) + time.perf_counter() - started
+        if text is None:
+            return
+        yield text
+
+
+def iter_pdf_pages(data: bytes, engine: str = PDF_ENGINE, result: Optional[PdfExtraction] = None) -> Iterator[str]:
+    """Yields page texts one at a time; pages after the caller stops are never parsed.
+
+    With "auto" the fast engine's first ``PDF_PROBE_PAGES`` pages are checked
+    with ``degradation_reason``; degraded output switches to pdfplumber from
+    the first page, and a fast-engine failure later on continues with
+    pdfplumber from the failed page. Engine, fallback reason, page count and
+    timings are written to ``result`` as pages are produced.
+    """
+    result = result if result is not None else PdfExtraction("", engine, 0)
+    if engine != "auto":
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown PDF engine '{engine}', expected auto or one of {', '.join(ENGINES)}")
+        result.engine = engine
+        for text in _timed_pages(engine, data, result.timings):
+            result.pages += 1
+            yield text
+        return
+
+    result.engine = FAST_ENGINE
+    fast = _timed_pages(FAST_ENGINE, data, result.timings)
+    try:
+        probe = list(itertools.islice(fast, PDF_PROBE_PAGES))
+        reason = degradation_reason("\n".join(probe), len(probe)) if probe else None
+    except Exception as e:
+        probe, reason = [], "error"
+        logging.warning(f"Fast PDF extraction failed, falling back to {ACCURATE_ENGINE}: {e}")
+    if reason is None:
+        try:
+            for text in itertools.chain(probe, fast):
+                result.pages += 1
+                yield text
+            return
+        except Exception as e:
+            reason = "error"
+            logging.warning(f"Fast PDF extraction failed on page {result.pages + 1}, "
+                            f"continuing with {ACCURATE_ENGINE}: {e}")
+
+    result.engine = ACCURATE_ENGINE
+    result.fallback_reason = reason
+    try:
+        for text in _timed_pages(ACCURATE_ENGINE, data, result.timings, result.pages):
+            result.pages += 1
+            yield text
+    except Exception:
+        if reason == "error" or result.pages:
+            raise
+        # Degraded text beats none
+        result.engine = FAST_ENGINE
+        for text in itertools.chain(probe, fast):
+            result.pages += 1
+            yield text
+
+
+def limit_pages(pages: Iterable[str], max_chars: int = 0, stop_after_sections: Tuple[str, ...] = (),
+                result: Optional[PdfExtraction] = None) -> Iterator[str]:
+    """Passes pages through until max_chars (0 = unlimited) or until every section in stop_after_sections is complete.
+
+    The page that crosses the budget is cut to fit it. A section counts as
+    complete once the heading of another section follows it.
+    """
+    lookup = heading_lookup(RESUME_SECTIONS)
+    pending = set(stop_after_sections)
+    current = None
+    used = 0
+    for text in pages:
+        if max_chars and used + len(text) > max_chars:
+            if used < max_chars:  # The separator before this page may already have spent the budget
+                yield text[:max_chars - used]
+            if result is not None:
+                result.stop_reason = "budget"
+            return
+        used += len(text) + 1
+        yield text
+        if pending:
+            for line in text.splitlines():
+                section = match_heading(line, lookup)
+                if section is not None and section != current:
+                    pending.discard(current)
+                    current = section
+            if not pending:
+                if result is not None:
+                    result.stop_reason = "sections"
+                return
+
+
+def extract_pdf(data: bytes, engine: str = PDF_ENGINE, max_tokens: int = PDF_MAX_TOKENS,
+                stop_after_sections: Tuple[str, ...] = PDF_STOP_AFTER_SECTIONS) -> PdfExtraction:
+    """Extracts PDF text page by page until the token budget or the key sections are reached.
+
+    Module level and free of shared state so process pools can run it; the
+    caller records the returned timings with ``record_extraction``.
+    """
+    result = PdfExtraction("", engine, 0)
+    pages = iter_pdf_pages(data, engine, result)
+    try:
+        limited = limit_pages(pages, max_tokens * CHARS_PER_TOKEN, stop_after_sections, result)
+        result.text = "\n".join(text for text in limited if text)
+    finally:
+        pages.close()  # Releases the parser when extraction stopped early
+    return result
+
+
+def record_extraction(result: PdfExtraction):
+    """Records engine choice, pages and per-engine timings of one extraction in the metrics registry."""
+    for engine, seconds in result.timings.items():
+        metrics.observe("smartscreen_pdf_engine_seconds", seconds, help="PDF text extraction time per engine tried.",
+                        engine=engine)
+    metrics.inc("smartscreen_pdf_extractions_total", help="PDF extractions by engine kept and fallback reason.",
+                engine=result.engine, fallback=result.fallback_reason or "none")
+    metrics.inc("smartscreen_pdf_pages_total", result.pages, help="PDF pages extracted per engine kept.",
+                engine=result.engine)
+    if result.stop_reason:
+        metrics.inc("smartscreen_pdf_early_stops_total", help="PDF extractions stopped before the last page.",
+                    reason=result.stop_reason)
@@ -0,0 +1,54 @@
+import re
+from typing import List, Sequence
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does
+each etc for from had has have having he her his how i if in into is it its may more most must no
+not of on or our out over own per she should so some such than that the their them then there these
+they this those through to under up us very was we were what when where which while who will with
+within would you your able ability work working team role candidate candidates experience years year
+strong good excellent knowledge skills skill including preferred required requirements responsibilities
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases text and splits it into keyword tokens, dropping stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def bm25_scores(query_terms: Sequence[str], term_weights: np.ndarray, resumes: List[str], k1: float = 1.5,
+                b: float = 0.75) -> np.ndarray:
+    """Scores every resume against weighted query terms with BM25 in one vectorized pass.
+
+    Document frequencies come from the batch itself. Each term's BM25 credit is
+    capped at what one mention earns in an average-length resume, so the score
+    is the share (0-100) of the query's weighted terms the resume covers:
+    frequent mentions of one term cannot make up for missing others, and long
+    resumes need more mentions for full credit.
+    """
+    if not len(query_terms) or not resumes:
+        return np.zeros(len(resumes))
+
+    term_index = {term: column for column, term in enumerate(query_terms)}
+    term_frequencies = np.zeros((len(resumes), len(query_terms)))
+    lengths = np.zeros(len(resumes))
+    for row, resume_text in enumerate(resumes):
+        tokens = tokenize(resume_text)
+        lengths[row] = len(tokens)
+        for token in tokens:
+            column = term_index.get(token)
+            if column is not None:
+                term_frequencies[row, column] += 1
+
+    document_frequencies = np.count_nonzero(term_frequencies, axis=0)
+    idf = np.log(1 + (len(resumes) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+    weighted_idf = idf * term_weights
+    average_length = max(lengths.mean(), 1.0)
+    norm = k1 * (1 - b + b * lengths / average_length)
+    saturated = term_frequencies * (k1 + 1) / (term_frequencies + norm[:, None])
+    coverage = np.minimum(saturated, 1.0)  # tf = 1 at average length saturates to exactly 1
+    return np.round(100 * (coverage @ weighted_idf) / weighted_idf.sum(), 2)
@@ -0,0 +1,267 @@
+import heapq
+import itertools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from metrics import metrics
+
+# Priority lanes: lower values are scheduled first
+INTERACTIVE = 0
+BULK = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Errors meaning "slow down" and errors meaning "the provider is struggling"
+RATE_LIMIT_ERRORS = (google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted)
+TRANSIENT_ERRORS = (google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError,
+                    google_exceptions.BadGateway, google_exceptions.GatewayTimeout,
+                    google_exceptions.DeadlineExceeded, ConnectionError, TimeoutError)
+RETRY_HINT_PATTERNS = (
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),  # "Please retry in 13.5s."
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),  # google.rpc.RetryInfo in the error details
+)
+
+_current_priority = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Runs the enclosed LLM calls in the given priority lane (for the current thread/context)."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """Returns "rate_limited", "transient" or None for errors that should not be retried."""
+    if isinstance(error, RATE_LIMIT_ERRORS) or getattr(error, "code", None) == 429:
+        return "rate_limited"
+    if isinstance(error, TRANSIENT_ERRORS):
+        return "transient"
+    return None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Reads the provider's retry hint from a Retry-After header or the error message, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = getattr(error, "retry_after", None) or headers.get("Retry-After")
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    for pattern in RETRY_HINT_PATTERNS:
+        match = pattern.search(str(error))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 units per second up to one minute's worth.
+
+    Not locked on its own; LLMScheduler guards it. per_minute <= 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount units are available (requests larger than capacity wait for a full bucket)."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) * 60 / self.per_minute
+
+    def consume(self, amount: float, now: float):
+        if self.per_minute > 0:
+            self._refill(now)
+            self.level -= min(amount, self.capacity)
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive provider failures and fails fast for reset_timeout seconds.
+
+    After the timeout one probe call is let through (half-open); its outcome
+    closes or re-opens the circuit. failure_threshold <= 0 disables the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go to the provider now."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"LLM provider unavailable; retrying in {remaining:.0f}s")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError("LLM provider unavailable; waiting for a probe request")
+                self._probe_in_flight = True
+
+    def record_success(self):
+        """The provider answered (a rate-limit or client error counts too: it is reachable)."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.failure_threshold > 0 and (self.state == self.HALF_OPEN or self.failures >= self.failure_threshold):
+                if self.state != self.OPEN:
+                    logging.error(f"LLM circuit breaker opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Single gate in front of every model call.
+
+    Calls wait for requests-per-minute and tokens-per-minute budget, with the
+    interactive lane always served before the bulk lane. Rate-limit and
+    transient errors are retried with full-jitter exponential backoff, using
+    the provider's retry hint when it gives one; a rate-limit response also
+    pauses all lanes for that long so the rest of a burst does not pile on.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_retries: int = 4,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, breaker: Optional[CircuitBreaker] = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(0)
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+
+    @classmethod
+    def from_env(cls) -> "LLMScheduler":
+        return cls(
+            requests_per_minute=float(os.getenv("GEMINI_RPM", "360")),
+            tokens_per_minute=float(os.getenv("GEMINI_TPM", "4000000")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+            backoff_base=float(os.getenv("LLM_BACKOFF_BASE", "1")),
+            backoff_max=float(os.getenv("LLM_BACKOFF_MAX", "60")),
+            breaker=CircuitBreaker(int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                                   float(os.getenv("LLM_BREAKER_RESET", "30"))),
+        )
+
+    def acquire(self, tokens: int, priority: int = INTERACTIVE) -> float:
+        """Blocks until this call may be sent; returns the seconds spent waiting."""
+        start = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] != ticket:
+                        self._cond.wait()  # Someone ahead of us (higher priority or earlier) goes first
+                        continue
+                    now = time.monotonic()
+                    delay = max(self._paused_until - now, self.requests.wait_time(1, now),
+                                self.tokens.wait_time(tokens, now))
+                    if delay <= 0:
+                        self.requests.consume(1, now)
+                        self.tokens.consume(tokens, now)
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+        return time.monotonic() - start
+
+    def pause(self, seconds: float):
+        """Holds every lane for the given number of seconds."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential delay, never shorter than the provider's retry hint."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, 0.1 * retry_after + 0.1)
+        return delay
+
+    def run(self, call, tokens: int = 0, priority: Optional[int] = None):
+        """Runs call() under the rate limits, retrying retryable errors; returns its result."""
+        priority = current_priority() if priority is None else priority
+        lane = LANE_NAMES.get(priority, str(priority))
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            waited = self.acquire(tokens, priority)
+            metrics.observe("smartscreen_llm_queue_seconds", waited,
+                            help="Time LLM calls waited for rate-limit budget, per lane.", lane=lane)
+            try:
+                result = call()
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == "transient":
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if kind is None or attempt >= self.max_retries:
+                    raise
+                retry_after = retry_after_seconds(e)
+                delay = self.backoff_delay(attempt, retry_after)
+                if kind == "rate_limited":
+                    self.pause(delay)
+                metrics.inc("smartscreen_llm_retries_total", help="LLM call retries by reason.", reason=kind)
+                logging.warning(f"LLM call {kind} (attempt {attempt + 1}/{self.max_retries + 1}), "
+                                f"retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from cache import sha256_hex
+
+
+def resume_hash(resume_text: str) -> str:
+    """Content hash identifying an extracted resume."""
+    return sha256_hex(resume_text)
+
+
+def job_description_hash(job_description: str) -> str:
+    """Content hash identifying a job description, ignoring whitespace differences."""
+    return sha256_hex(" ".join(job_description.split()))
+
+
+class ResultStore:
+    """Embedded SQLite (WAL mode) store of bulk analysis rows keyed by resume hash and JD hash.
+
+    Rows are written as soon as each resume is analyzed, so a re-submitted run
+    only pays for the resumes that were not finished before. Rows older than
+    ``ttl`` seconds (None keeps them forever) are not returned.
+    """
+
+    def __init__(self, db_path: str, ttl: Optional[float] = None):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "resume_hash TEXT NOT NULL, jd_hash TEXT NOT NULL, row TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (resume_hash, jd_hash))"
+            )
+            # MinHash signatures and LSH bands of analyzed resumes, for near-duplicate lookups across runs
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resume_signatures (resume_hash TEXT PRIMARY KEY, signature BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resume_bands (band TEXT NOT NULL, resume_hash TEXT NOT NULL, "
+                "PRIMARY KEY (band, resume_hash))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers proceed while a worker writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, resume_hashes: Iterable[str], jd_hash: str) -> Dict[str, dict]:
+        """Returns {resume_hash: row} for every hash already analyzed against the JD."""
+        resume_hashes = list(set(resume_hashes))
+        found = {}
+        conn = self._connection()
+        oldest = time.time() - self.ttl if self.ttl else 0
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(resume_hashes), 500):
+            chunk = resume_hashes[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = conn.execute(
+                "SELECT resume_hash, row FROM analyses WHERE jd_hash = ? AND created_at >= ? "
+                f"AND resume_hash IN ({placeholders})",
+                [jd_hash, oldest, *chunk],
+            ).fetchall()
+            found.update((key, json.loads(row)) for key, row in rows)
+        return found
+
+    def get(self, resume_hash: str, jd_hash: str) -> Optional[dict]:
+        """Returns the stored row for one resume/JD pair, or None."""
+        return self.get_many([resume_hash], jd_hash).get(resume_hash)
+
+    def put(self, resume_hash: str, jd_hash: str, row: dict):
+        """Records the analysis row for a resume/JD pair."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (resume_hash, jd_hash, row, created_at) VALUES (?, ?, ?, ?)",
+                (resume_hash, jd_hash, json.dumps(row, default=str), time.time()),
+            )
+
+    def put_signature(self, resume_hash: str, signature: np.ndarray, bands: List[str]):
+        """Records a resume's MinHash signature and LSH bands."""
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO resume_signatures (resume_hash, signature) VALUES (?, ?)",
+                         (resume_hash, signature.astype(np.uint32).tobytes()))
+            conn.executemany("INSERT OR IGNORE INTO resume_bands (band, resume_hash) VALUES (?, ?)",
+                             [(band, resume_hash) for band in bands])
+
+    def similar_signatures(self, bands: List[str]) -> Dict[str, np.ndarray]:
+        """Returns {resume_hash: signature} for stored resumes sharing at least one LSH band."""
+        placeholders = ", ".join("?" * len(bands))
+        rows = self._connection().execute(
+            "SELECT resume_hash, signature FROM resume_signatures WHERE resume_hash IN "
+            f"(SELECT resume_hash FROM resume_bands WHERE band IN ({placeholders}))",
+            bands,
+        ).fetchall()
+        return {key: np.frombuffer(signature, dtype=np.uint32) for key, signature in rows}
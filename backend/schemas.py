@@ -0,0 +1,291 @@
+import json
+import re
+import threading
+from dataclasses import asdict, dataclass, fields
+from typing import List
+
+
+class SchemaError(ValueError):
+    """Raised when an LLM response is not valid JSON for the expected schema."""
+
+
+FENCE_PATTERN = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+
+def _percentage(value, name: str) -> str:
+    try:
+        number = float(str(value).replace("%", "").strip())
+    except ValueError:
+        raise SchemaError(f"'{name}' must be a number between 0 and 100, got {value!r}")
+    if not 0 <= number <= 100:
+        raise SchemaError(f"'{name}' must be between 0 and 100, got {number}")
+    return f"{number:g}"
+
+
+def _validate(cls, data):
+    """Builds a schema dataclass from a dict, checking every field's type."""
+    if not isinstance(data, dict):
+        raise SchemaError(f"{cls.__name__} must be a JSON object, got {type(data).__name__}")
+    values = {}
+    for field in fields(cls):
+        if field.name not in data:
+            raise SchemaError(f"{cls.__name__} is missing required key '{field.name}'")
+        value = data[field.name]
+        if field.name.endswith("percentage"):
+            value = _percentage(value, field.name)
+        elif field.type is str:
+            if not isinstance(value, (str, int, float)):
+                raise SchemaError(f"'{field.name}' must be a string")
+            value = str(value)
+        elif field.type == List[str]:
+            if isinstance(value, str):
+                value = [value]  # A lone string is a one-item list
+            if not isinstance(value, list) or not all(isinstance(item, (str, int, float)) for item in value):
+                raise SchemaError(f"'{field.name}' must be a list of strings")
+            value = [str(item) for item in value]
+        values[field.name] = value
+    return cls(**values)
+
+
+@dataclass
+class IndividualAnalysis:
+    match_percentage: str
+    found_keywords: List[str]
+    missing_keywords: List[str]
+    key_strengths: List[str]
+    areas_for_improvement: List[str]
+    resume_formatting_tips: List[str]
+
+    @classmethod
+    def from_dict(cls, data) -> "IndividualAnalysis":
+        return _validate(cls, data)
+
+    def to_display(self) -> dict:
+        return {
+            "Match Percentage": self.match_percentage,
+            "Found Keywords": self.found_keywords,
+            "Missing Keywords": self.missing_keywords,
+            "Key Strengths": self.key_strengths,
+            "Areas for Improvement": self.areas_for_improvement,
+            "Resume Formatting & Optimization Tips": self.resume_formatting_tips,
+        }
+
+
+@dataclass
+class IndividualAssessment:
+    """Individual analysis when found/missing keywords come from the local keyword engine instead of the LLM."""
+    match_percentage: str
+    key_strengths: List[str]
+    areas_for_improvement: List[str]
+    resume_formatting_tips: List[str]
+
+    @classmethod
+    def from_dict(cls, data) -> "IndividualAssessment":
+        return _validate(cls, data)
+
+    def to_display(self, found_keywords: List[str], missing_keywords: List[str]) -> dict:
+        return IndividualAnalysis(self.match_percentage, found_keywords, missing_keywords, self.key_strengths,
+                                  self.areas_for_improvement, self.resume_formatting_tips).to_display()
+
+
+@dataclass
+class BulkAnalysis:
+    suitability: str
+    key_strengths: List[str]
+    areas_for_improvement: List[str]
+    match_percentage: str
+
+    @classmethod
+    def from_dict(cls, data) -> "BulkAnalysis":
+        return _validate(cls, data)
+
+    def to_display(self) -> dict:
+        return {
+            "Suitability": self.suitability,
+            "Key Strengths": self.key_strengths,
+            "Areas for Improvement": self.areas_for_improvement,
+            "Match Percentage": self.match_percentage,
+        }
+
+
+@dataclass
+class InteractiveSuggestion:
+    section: str
+    line_content: str
+    suggestion: str
+    reason: str
+
+    @classmethod
+    def from_dict(cls, data) -> "InteractiveSuggestion":
+        return _validate(cls, data)
+
+    def to_display(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class CombinedAnalysis:
+    match_percentage: str
+    suitability: str
+    reason: str
+    keyword_analysis: str
+    formatting_review: str
+    resume_review: str
+
+    @classmethod
+    def from_dict(cls, data) -> "CombinedAnalysis":
+        return _validate(cls, data)
+
+
+def _close_truncated_json(text: str) -> str:
+    """Closes strings, objects and arrays left open by a truncated (e.g. streamed) response.
+
+    A value cut mid-way (a string, or a number or literal that may have lost
+    digits) is dropped back to the last complete element, so "85" cut to "8"
+    never parses as a score.
+    """
+    closers = []
+    in_string = False
+    escaped = False
+    boundary, boundary_closers = 0, []  # End of the last complete element and the containers open there
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+        if not in_string and char in "{[}],":
+            boundary, boundary_closers = position + 1, list(closers)
+    stripped = text.rstrip()
+    if in_string or (stripped and stripped[-1] not in '"{[}],:'):
+        text, closers = text[:boundary], boundary_closers
+    text = text.rstrip().rstrip(",")
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(closers))
+
+
+def extract_json(text: str, root: str = "{", allow_truncated: bool = False):
+    """Extracts the first JSON value starting with root ('{' or '[') from an LLM response.
+
+    Tolerates markdown fences and prose before or after the JSON. A response
+    cut off mid-value is rejected unless allow_truncated is set, in which case
+    it is closed with ``_close_truncated_json``.
+    """
+    text = FENCE_PATTERN.sub("", text or "")
+    start = text.find(root)
+    if start == -1:
+        raise SchemaError(f"Response does not contain a JSON {'object' if root == '{' else 'array'}")
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text, start)
+        return value
+    except json.JSONDecodeError as e:
+        if not allow_truncated:
+            raise SchemaError(f"Response is not valid JSON: {e}")
+    try:
+        return json.loads(_close_truncated_json(text[start:]))
+    except json.JSONDecodeError as e:
+        raise SchemaError(f"Response is not valid JSON: {e}")
+
+
+def parse_response(text: str, schema, many: bool = False, allow_truncated: bool = False):
+    """Parses a response into a schema instance, or a list of them when many is True."""
+    data = extract_json(text, "[" if many else "{", allow_truncated)
+    if many:
+        if not isinstance(data, list):
+            raise SchemaError(f"Expected a JSON array of {schema.__name__} objects")
+        return [schema.from_dict(item) for item in data]
+    return schema.from_dict(data)
+
+
+def validator(schema, many: bool = False):
+    """A validate(text) callable for ``LLMClient.generate`` that raises SchemaError for responses that do not parse."""
+    return lambda text: parse_response(text, schema, many)
+
+
+def build_repair_prompt(schema, many: bool, response_text: str, error: Exception) -> str:
+    """Builds a short re-prompt asking the model to fix its own output without resending the inputs."""
+    keys = ", ".join(f'"{field.name}"' for field in fields(schema))
+    shape = f"a JSON array of objects with keys {keys}" if many else f"a JSON object with keys {keys}"
+    return f"""The following output should have been {shape}, but it failed validation: {error}
+Percentages are numbers between 0 and 100 and list fields are arrays of strings.
+Return ONLY the corrected JSON, keeping the original content wherever possible.
+
+Output to correct:
+{response_text}
+"""
+
+
+class ParseMetrics:
+    """Thread-safe counters of structured-output parse outcomes per schema."""
+
+    OUTCOMES = ("parsed", "repaired", "failed")
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, schema_name: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(schema_name, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def stats(self) -> dict:
+        """Returns the counters plus first-pass and final failure rates per schema."""
+        with self._lock:
+            stats = {}
+            for schema_name, counts in self._counts.items():
+                total = sum(counts.values())
+                stats[schema_name] = dict(
+                    counts,
+                    total=total,
+                    first_pass_failure_rate=round((counts["repaired"] + counts["failed"]) / total, 4),
+                    failure_rate=round(counts["failed"] / total, 4),
+                )
+            return stats
+
+
+parse_metrics = ParseMetrics()
+
+
+def parse_with_repair(text: str, schema, many: bool = False, repair=None, metrics: ParseMetrics = parse_metrics):
+    """Parses a response against a schema, re-prompting once through repair(prompt, validate) if validation fails.
+
+    Only complete, valid JSON counts as "parsed". A truncated response goes to
+    the repair re-prompt like any other invalid one; closing it locally is the
+    last resort, used when there is no repair or it fails, and counts as "repaired".
+    """
+    try:
+        result = parse_response(text, schema, many)
+        metrics.record(schema.__name__, "parsed")
+        return result
+    except SchemaError as e:
+        error = e
+
+    if repair is not None:
+        try:
+            repaired = repair(build_repair_prompt(schema, many, text, error), validator(schema, many))
+            result = parse_response(repaired, schema, many)
+            metrics.record(schema.__name__, "repaired")
+            return result
+        except SchemaError:
+            pass
+        except Exception:
+            metrics.record(schema.__name__, "failed")
+            raise
+
+    try:
+        result = parse_response(text, schema, many, allow_truncated=True)
+        metrics.record(schema.__name__, "repaired")
+        return result
+    except SchemaError:
+        metrics.record(schema.__name__, "failed")
+        raise error
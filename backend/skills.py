@@ -0,0 +1,141 @@
+import re
+from typing import Dict, Iterable, Set
+
+# Canonical skill -> aliases it also appears as (all lowercase). The canonical name is matched too.
+SKILL_ALIASES: Dict[str, tuple] = {
+    # Languages
+    "python": ("python3", "py"),
+    "java": (),
+    "javascript": ("js", "ecmascript", "es6"),
+    "typescript": ("ts",),
+    "c": (),
+    "c++": ("cpp",),
+    "c#": ("csharp", "c sharp"),
+    "go": ("golang",),
+    "rust": (),
+    "ruby": (),
+    "php": (),
+    "kotlin": (),
+    "swift": (),
+    "scala": (),
+    "r": (),
+    "matlab": (),
+    "bash": ("shell scripting", "shell"),
+    "sql": (),
+    "html": ("html5",),
+    "css": ("css3",),
+    # Frameworks and libraries
+    "react": ("react.js", "reactjs"),
+    "angular": ("angular.js", "angularjs"),
+    "vue": ("vue.js", "vuejs"),
+    "next.js": ("nextjs",),
+    "node.js": ("node", "nodejs"),
+    "express": ("express.js", "expressjs"),
+    "django": (),
+    "flask": (),
+    "fastapi": (),
+    "spring": ("spring boot", "springboot"),
+    ".net": ("dotnet", "asp.net"),
+    "rails": ("ruby on rails",),
+    "pandas": (),
+    "numpy": (),
+    "scikit-learn": ("sklearn", "scikit learn"),
+    "tensorflow": (),
+    "pytorch": ("torch",),
+    "keras": (),
+    "spark": ("apache spark", "pyspark"),
+    "hadoop": (),
+    "airflow": ("apache airflow",),
+    "kafka": ("apache kafka",),
+    "graphql": (),
+    "rest apis": ("rest", "restful", "rest api", "restful apis"),
+    "grpc": (),
+    # Data stores
+    "postgresql": ("postgres",),
+    "mysql": (),
+    "sqlite": (),
+    "oracle": (),
+    "sql server": ("mssql", "microsoft sql server"),
+    "mongodb": ("mongo",),
+    "redis": (),
+    "elasticsearch": ("elastic search", "opensearch"),
+    "cassandra": (),
+    "dynamodb": (),
+    "snowflake": (),
+    "bigquery": ("big query",),
+    # Cloud and infrastructure
+    "aws": ("amazon web services",),
+    "gcp": ("google cloud", "google cloud platform"),
+    "azure": ("microsoft azure",),
+    "docker": (),
+    "kubernetes": ("k8s",),
+    "terraform": (),
+    "ansible": (),
+    "jenkins": (),
+    "ci/cd": ("cicd", "ci cd", "continuous integration", "continuous delivery"),
+    "git": ("github", "gitlab"),
+    "linux": ("unix",),
+    "microservices": ("microservice",),
+    # Data and ML
+    "machine learning": ("ml",),
+    "deep learning": ("dl",),
+    "natural language processing": ("nlp",),
+    "computer vision": ("cv",),
+    "data analysis": ("data analytics",),
+    "data visualization": (),
+    "etl": (),
+    "statistics": ("statistical analysis",),
+    "tableau": (),
+    "power bi": ("powerbi",),
+    "excel": ("microsoft excel", "ms excel"),
+    "llm": ("llms", "large language models"),
+    # Practices
+    "agile": ("scrum", "kanban"),
+    "unit testing": ("tdd", "test driven development"),
+    "system design": (),
+    "object-oriented programming": ("oop", "object oriented programming"),
+    "data structures": (),
+    "algorithms": (),
+    "security": ("cybersecurity", "cyber security"),
+    "project management": (),
+    "communication": ("communication skills",),
+    "leadership": (),
+}
+
+# Aliases too ambiguous to match on their own in free text ("go to", "r&d", "cv" as resume)
+AMBIGUOUS_ALIASES = frozenset({"c", "r", "go", "py", "ts", "cv", "dl", "ml", "node", "rest", "shell", "oracle",
+                               "spring", "swift", "express", "git", "excel", "security", "leadership",
+                               "communication"})
+
+SKILL_BOUNDARY = r"(?<![a-z0-9+#.])(?:{})(?![a-z0-9+#])"
+
+
+def alias_map(include_ambiguous: bool = True) -> Dict[str, str]:
+    """Returns {surface form: canonical skill} for every skill and alias."""
+    mapping = {}
+    for canonical, aliases in SKILL_ALIASES.items():
+        for form in (canonical, *aliases):
+            if include_ambiguous or form not in AMBIGUOUS_ALIASES:
+                mapping[form] = canonical
+    return mapping
+
+
+def _build_pattern(forms: Iterable[str]):
+    alternatives = "|".join(re.escape(form) for form in sorted(forms, key=len, reverse=True))
+    return re.compile(SKILL_BOUNDARY.format(alternatives))
+
+
+_ALL_FORMS = alias_map()
+_UNAMBIGUOUS = alias_map(include_ambiguous=False)
+_SKILL_PATTERN = _build_pattern(_UNAMBIGUOUS)
+
+
+def find_skills(text: str) -> Set[str]:
+    """Returns the canonical vocabulary skills mentioned in text, skipping ambiguous short aliases."""
+    return {_UNAMBIGUOUS[match.group(0)] for match in _SKILL_PATTERN.finditer(text.lower())}
+
+
+def canonical_skill(term: str) -> str:
+    """Maps a surface form to its canonical skill name, or returns it lowercased if it is not in the vocabulary."""
+    term = " ".join(term.lower().split())
+    return _ALL_FORMS.get(term, term)
@@ -0,0 +1,14 @@
+import logging
+import os
+import sys
+
+# The backend modules import each other flat, as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import _configure_environment
+
+# Hermetic runs, set before the backend modules read them: no persisted stores, no rate limits.
+# The text cache is off too, so every upload extracts afresh and retained texts would show up in memory.
+_configure_environment()
+
+logging.disable(logging.CRITICAL)  # Keeps app.py's backend.log untouched
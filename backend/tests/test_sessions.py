@@ -0,0 +1,89 @@
+import gc
+import io
+import json
+import tracemalloc
+
+import pytest
+
+from benchmarks.corpus import make_corpus, make_job_description, make_zip
+from benchmarks.fake_llm import FakeGenerativeModel
+from cache import ResponseCache
+from llm_client import get_llm_client
+
+import app as flask_app
+
+UPLOADS = 5
+RESUMES_PER_UPLOAD = 3
+
+
+@pytest.fixture
+def fake_model():
+    """Points the shared LLM client at a fresh fake model with the response cache off, so every analysis is a call."""
+    client = get_llm_client()
+    previous_cache = client.response_cache
+    previous_model = client._models.get(client.model_name)
+    client.response_cache = ResponseCache(max_entries=0)
+    fake = FakeGenerativeModel()
+    client.use_model(fake)
+    yield fake
+    client.response_cache = previous_cache
+    if previous_model is None:
+        client._models.pop(client.model_name, None)  # The real model is built again on first use
+    else:
+        client.use_model(previous_model)
+
+
+@pytest.fixture
+def client():
+    return flask_app.app.test_client()
+
+
+def upload(client, archive: bytes, job_description: str) -> list:
+    """Runs one streamed bulk analysis and returns its result records."""
+    response = client.post('/api/bulk-analyze/stream', data={
+        'resumes': (io.BytesIO(archive), 'resumes.zip'),
+        'job_description': job_description,
+    })
+    assert response.status_code == 200
+    records = [line for line in response.get_data(as_text=True).splitlines() if line]
+    return [record for record in map(json.loads, records) if record['type'] == 'result']
+
+
+def test_repeated_uploads_cost_constant_llm_calls(client, fake_model):
+    archive = make_zip(make_corpus(RESUMES_PER_UPLOAD, seed=1))
+    job_description = make_job_description(1)
+
+    calls_per_upload = []
+    for _ in range(UPLOADS):
+        before = fake_model.calls
+        results = upload(client, archive, job_description)
+        calls_per_upload.append(fake_model.calls - before)
+        assert len(results) == RESUMES_PER_UPLOAD
+
+    assert calls_per_upload == [RESUMES_PER_UPLOAD] * UPLOADS
+    # Requests work on sessions; the shared backends never accumulate state
+    assert flask_app.bulk_backend.resumes_data == []
+    assert flask_app.ats_backend.resume_text is None
+    assert flask_app.ats_backend.job_description is None
+
+
+def test_repeated_uploads_keep_memory_flat(client, fake_model):
+    # Long resumes, so retaining even one upload's texts (~40 KB) would stand out from allocator noise
+    archive = make_zip(make_corpus(RESUMES_PER_UPLOAD, seed=2, min_pages=8, max_pages=8))
+    job_description = make_job_description(2)
+    for _ in range(2):  # Warm-up: first-use allocations (profiles, automata, caches) settle
+        upload(client, archive, job_description)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(UPLOADS):
+            upload(client, archive, job_description)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # What remains is interpreter caches (regexes, JSON scanners), not resumes piling up per upload
+    assert current - baseline < 64 * 1024
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import posixpath
+import zipfile
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import Iterator, Optional, Tuple
+
+# Limits for uploaded archives; sizes are uncompressed bytes and are checked against the bytes actually inflated
+ZIP_MAX_ENTRIES = int(os.getenv("ZIP_MAX_ENTRIES", "2000"))
+ZIP_MAX_MEMBER_BYTES = int(os.getenv("ZIP_MAX_MEMBER_BYTES", str(20 * 1024 * 1024)))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", str(512 * 1024 * 1024)))
+ZIP_MAX_COMPRESSION_RATIO = float(os.getenv("ZIP_MAX_COMPRESSION_RATIO", "100"))
+# Members up to this size stay in memory while queued; larger ones are spooled to a temporary file
+ZIP_SPOOL_MAX_MEMORY = int(os.getenv("ZIP_SPOOL_MAX_MEMORY", str(1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+class ZipLimitError(ValueError):
+    """The archive as a whole breaks an ingestion limit (entry count or total uncompressed size)."""
+
+
+@dataclass
+class ZipMember:
+    filename: str  # Normalized path inside the archive, e.g. "team-a/jane.pdf"
+    spool: SpooledTemporaryFile
+    size: int
+    sha256: str
+
+    def read(self) -> bytes:
+        self.spool.seek(0)
+        return self.spool.read()
+
+    def close(self):
+        self.spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def member_path(name: str) -> Optional[str]:
+    """Normalizes an archive path, or returns None for directories, OS metadata and paths escaping the root."""
+    path = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    parts = path.split("/")
+    if name.endswith("/") or path in ("", ".") or ".." in parts:
+        return None
+    if parts[0] == "__MACOSX" or any(part.startswith(".") for part in parts):
+        return None
+    return path
+
+
+class _ArchiveBudget:
+    """Uncompressed bytes still allowed for the archive, counting members that were later rejected too."""
+
+    def __init__(self, total: int):
+        self.remaining = total
+
+    def consume(self, size: int):
+        self.remaining -= size
+        if self.remaining < 0:
+            raise ZipLimitError(f"Archive exceeds {ZIP_MAX_TOTAL_BYTES} uncompressed bytes")
+
+
+def _spool_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, budget: _ArchiveBudget) -> ZipMember:
+    """Inflates one member chunk by chunk into a spooled file, enforcing the size and ratio caps as it goes.
+
+    Raises ValueError for a member over its own caps and ZipLimitError once
+    the archive budget is spent.
+    """
+    max_ratio_bytes = ZIP_MAX_COMPRESSION_RATIO * max(info.compress_size, 1)
+    spool = SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_MEMORY)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with archive.open(info) as member_file:
+            while True:
+                chunk = member_file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                budget.consume(len(chunk))
+                if size > ZIP_MAX_MEMBER_BYTES:
+                    raise ValueError(f"Member exceeds {ZIP_MAX_MEMBER_BYTES} uncompressed bytes")
+                if size > max_ratio_bytes:
+                    raise ValueError(f"Member exceeds the {ZIP_MAX_COMPRESSION_RATIO:g}:1 compression ratio limit")
+                digest.update(chunk)
+                spool.write(chunk)
+    except Exception:
+        spool.close()
+        raise
+    return ZipMember(member_path(info.filename), spool, size, digest.hexdigest())
+
+
+def iter_zip_members(source, suffixes: Tuple[str, ...] = (".pdf",)
+                     ) -> Iterator[Tuple[str, Optional[ZipMember], Optional[Exception]]]:
+    """Yields ``(path, member, error)`` for every archive file with one of the suffixes, nested folders included.
+
+    Members are inflated lazily, one at a time, into spooled files that move to
+    disk past ``ZIP_SPOOL_MAX_MEMORY``, so the archive is never held in memory
+    as a whole. A member
+    over its size or compression-ratio cap, or encrypted, is reported with an
+    error and skipped. Too many entries or too many uncompressed bytes in
+    total raise ``ZipLimitError``. Callers close each member when done with it.
+    """
+    with zipfile.ZipFile(source) as archive:
+        infos = archive.infolist()
+        if len(infos) > ZIP_MAX_ENTRIES:
+            raise ZipLimitError(f"Archive has {len(infos)} entries, the limit is {ZIP_MAX_ENTRIES}")
+        budget = _ArchiveBudget(ZIP_MAX_TOTAL_BYTES)
+        for info in infos:
+            path = member_path(info.filename)
+            if info.is_dir() or path is None or not path.lower().endswith(suffixes):
+                continue
+            if info.flag_bits & 0x1:
+                yield path, None, ValueError("Encrypted members are not supported")
+                continue
+            if info.file_size > ZIP_MAX_MEMBER_BYTES:  # Declared size; the real one is checked while inflating
+                yield path, None, ValueError(f"Member exceeds {ZIP_MAX_MEMBER_BYTES} uncompressed bytes")
+                continue
+            try:
+                member = _spool_member(archive, info, budget)
+            except ZipLimitError:
+                raise
+            except Exception as e:
+                yield path, None, e
+                continue
+            yield path, member, None
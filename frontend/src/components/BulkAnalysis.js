@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { Box, Button, Typography, TextField, Container, CircularProgress } from '@mui/material'; // <-- Add CircularProgress
 import HomeIcon from '@mui/icons-material/Home';
-import { analyzeBulkResumes } from '../services/api';
+import { streamBulkResumes } from '../services/api';
 
 const BulkAnalysis = ({ onBack }) => {
   const [file, setFile] = useState(null);
@@ -21,8 +21,16 @@ const BulkAnalysis = ({ onBack }) => {
       const formData = new FormData();
       formData.append('resumes', file);
       formData.append('job_description', jobDescription);
-      const data = await analyzeBulkResumes(formData);
-      setResults(data);
+      // Show each row as soon as the backend finishes it
+      await streamBulkResumes(formData, (record) => {
+        if (record.type === 'result') {
+          setResults((rows) => {
+            const next = rows ? [...rows] : new Array(record.total).fill(null);
+            next[record.index] = record.row;
+            return next;
+          });
+        }
+      });
     } catch (err) {
       setError(err.message);
     } finally {
@@ -185,9 +193,9 @@ const BulkAnalysis = ({ onBack }) => {
               </tr>
             </thead>
             <tbody>
-              {results.map((row, idx) => (
+              {results.filter(Boolean).map((row, idx) => (
                 <tr key={idx} style={{ background: idx % 2 === 0 ? '#fff' : '#f9f6f2' }}>
-                  <td style={{ border: '1px solid #bdbdbd', padding: '8px' }}>{row.name}</td>
+                  <td style={{ border: '1px solid #bdbdbd', padding: '8px' }}>{row.filename}</td>
                   <td style={{ border: '1px solid #bdbdbd', padding: '8px' }}>{row["Match Percentage"]}</td>
                   <td style={{
                     border: '1px solid #bdbdbd',
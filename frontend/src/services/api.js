@@ -15,15 +15,38 @@ export const analyzeResume = async (formData) => {
   }
 };
 
-export const analyzeBulkResumes = async (formData) => {
-  try {
-    const response = await axios.post(`${API_BASE_URL}/bulk-analyze`, formData, {
-      headers: {
-        'Content-Type': 'multipart/form-data',
-      },
-    });
-    return response.data;
-  } catch (error) {
-    throw new Error(error.response?.data?.message || 'Error analyzing resumes');
+// Streams bulk results as NDJSON; onRecord is called with each parsed record
+// ({type: 'result', index, total, row}, then {type: 'summary', ...}).
+export const streamBulkResumes = async (formData, onRecord) => {
+  const response = await fetch(`${API_BASE_URL}/bulk-analyze/stream`, {
+    method: 'POST',
+    body: formData,
+  });
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.error || 'Error analyzing resumes');
   }
-};
\ No newline at end of file
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) {
+        continue;
+      }
+      const record = JSON.parse(line);
+      if (record.type === 'error') {
+        throw new Error(record.error);
+      }
+      onRecord(record);
+    }
+  }
+};